@@ -3,22 +3,25 @@ import os
 import time
 import tempfile
 import re
-import random
+import sys
 import threading
-import asyncio
 import subprocess
 
 import numpy as np
 import sounddevice as sd
 import soundfile as sf
 
-# edge_tts for Neerja voice
-import edge_tts
 from playsound3 import playsound
 
-import whisper
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+# share the backend's cached edge-tts synthesizer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from tts_engine import synthesize_mp3_bytes, warm_tts_cache
+from stream_stt import StreamingTranscriber
+from utils import detect_user_type
+from question_bank import question_bank
+from stt_engine import transcribe_array
+from llm_engine import ask_llm
+import model_runtime
 
 # ----------------------------
 # CONFIG
@@ -28,7 +31,6 @@ SILENCE_DURATION = 6.0      # seconds of silence to stop
 SAMPLE_RATE = 16000
 BLOCKSIZE = 1024
 
-MODEL_NAME = "Qwen/Qwen2.5-3B-Instruct"  # local model
 MAX_MAIN_QUESTIONS = 6
 QUESTION_GEN_TOKENS = 64
 FOLLOWUP_GEN_TOKENS = 64
@@ -37,39 +39,6 @@ FEEDBACK_GEN_TOKENS = 360
 # ----------------------------
 # EDGE TTS (Neerja)
 # ----------------------------
-EDGE_VOICE = "en-IN-NeerjaNeural"
-
-async def _edge_synth(text: str, out_mp3: str):
-    """Asynchronous edge_tts synth to save MP3 to out_mp3."""
-    comm = edge_tts.Communicate(text, voice=EDGE_VOICE)
-    await comm.save(out_mp3)
-
-def run_async(coro_fn, *args, **kwargs):
-    """
-    Run coroutine safely even if an event loop is already running.
-    If asyncio.run() works, use it. Otherwise run in a separate thread
-    that executes asyncio.run() so caller blocks until completion.
-    """
-    try:
-        # Try the simple path first
-        return asyncio.run(coro_fn(*args, **kwargs))
-    except RuntimeError:
-        # event loop already running — use a thread to run asyncio.run there
-        result_holder = {}
-
-        def _target():
-            try:
-                result_holder['result'] = asyncio.run(coro_fn(*args, **kwargs))
-            except Exception as e:
-                result_holder['exc'] = e
-
-        th = threading.Thread(target=_target)
-        th.start()
-        th.join()
-        if 'exc' in result_holder:
-            raise result_holder['exc']
-        return result_holder.get('result')
-
 def speak(text: str):
     """Synthesize text with edge-tts (Neerja), play it, cleanup. Blocks until playback done."""
     text = (text or "").strip()
@@ -79,8 +48,9 @@ def speak(text: str):
     mp3_path = tempfile.mktemp(suffix=".mp3")
 
     try:
-        # 1) synthesize mp3 file (edge-tts)
-        run_async(_edge_synth, text, mp3_path)
+        # 1) synthesize mp3 file (edge-tts, cached on repeat phrases)
+        with open(mp3_path, "wb") as f:
+            f.write(synthesize_mp3_bytes(text))
 
         # 2) play mp3 (playsound3 is simple and worked for you before)
         #    playsound blocks until finished.
@@ -105,10 +75,11 @@ def speak(text: str):
 # ----------------------------
 # RECORD UNTIL SILENCE
 # ----------------------------
-def record_until_silence(filename="input.wav", timeout=90):
+def record_until_silence(filename=None, timeout=90, on_chunk=None):
     """
     Record from default input until SILENCE_DURATION of near-silence
-    or until timeout. Writes to `filename` and returns it.
+    or until timeout. Writes to `filename` (if given) and returns it.
+    `on_chunk`, if given, also receives every mono block as it is captured.
     """
     print("Listening... (speak now)")
     rec = []
@@ -117,7 +88,10 @@ def record_until_silence(filename="input.wav", timeout=90):
 
     def callback(indata, frames, time_info, status):
         # copy because sounddevice reuses the buffer
-        rec.append(indata.copy())
+        block = indata.copy()
+        rec.append(block)
+        if on_chunk is not None:
+            on_chunk(block[:, 0])
 
     try:
         with sd.InputStream(channels=1, samplerate=SAMPLE_RATE, blocksize=BLOCKSIZE, callback=callback):
@@ -127,6 +101,8 @@ def record_until_silence(filename="input.wav", timeout=90):
                     continue
 
                 n_blocks = max(1, int(0.5 * SAMPLE_RATE / BLOCKSIZE))
+                if filename is None:
+                    del rec[:-n_blocks]   # nothing to save: only the silence check needs audio
                 recent = np.concatenate(rec[-n_blocks:], axis=0)
                 rms = np.sqrt(np.mean(recent.astype(np.float32) ** 2))
 
@@ -143,10 +119,15 @@ def record_until_silence(filename="input.wav", timeout=90):
                     break
     except Exception as e:
         print("Microphone / InputStream error:", e)
+        if filename is None:
+            return None
         # write a very short silent file to avoid later crashes
         sf.write(filename, np.zeros((1600,1), dtype=np.float32), SAMPLE_RATE)
         return filename
 
+    if filename is None:
+        return None
+
     if not rec:
         # nothing recorded, save a tiny silent file
         sf.write(filename, np.zeros((1600,1), dtype=np.float32), SAMPLE_RATE)
@@ -160,86 +141,44 @@ def record_until_silence(filename="input.wav", timeout=90):
 
 
 # ----------------------------
-# Whisper STT
+# Whisper STT (shared backend runtime)
 # ----------------------------
-print("Loading Whisper-small...")
-whisper_model = whisper.load_model("small")
+def transcribe_audio(audio, prompt=None):
+    # recordings end with SILENCE_DURATION of silence; don't make Whisper decode it
+    return transcribe_array(audio, prompt, vad=True)
 
-def transcribe(path):
+def listen_and_transcribe(timeout=90):
+    """
+    Record an answer and transcribe it while it is being spoken: finished
+    segments are decoded in the background, so only the tail is left at the end.
+    """
+    stream = StreamingTranscriber(transcribe_audio)
+    record_until_silence(timeout=timeout, on_chunk=stream.feed)
     print("Transcribing...")
-    try:
-        res = whisper_model.transcribe(path)
-        return res.get("text", "").strip()
-    except Exception as e:
-        print("Whisper transcribe error:", e)
-        return ""
+    return stream.finish()
 
 
 # ----------------------------
 # Local LLM (Qwen)
 # ----------------------------
-print("Loading Qwen2.5-3B-Instruct (CPU)...")
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForCausalLM.from_pretrained(MODEL_NAME, torch_dtype=torch.float32, device_map=None)
-model.eval()
-print("Qwen loaded.")
-
-def generate_llm_guarded(prompt, max_new_tokens=128, temperature=0.22, retries=2, require_question=False):
+def generate_llm_guarded(prompt, max_new_tokens=128, temperature=0.22, require_question=False):
     """
     Generate text but return only generated tokens (no echo).
-    If require_question=True, ensure the output contains at least one '?'.
-    Retries a couple times with slight prompt tweaks if not valid.
+    If require_question=True, decoding stops at the end of the first question
+    and that question is returned (one pass, no retries).
+    Decoding is greedy on the backend's shared model, so `temperature` has no effect.
     """
-    for attempt in range(retries):
-        inputs = tokenizer(prompt, return_tensors="pt")
-        input_len = inputs["input_ids"].shape[1]
-        with torch.no_grad():
-            out = model.generate(
-                **inputs,
-                max_new_tokens=max_new_tokens,
-                temperature=temperature,
-                do_sample=False,
-                pad_token_id=tokenizer.eos_token_id
-            )
-        gen_ids = out[0][input_len:]
-        text = tokenizer.decode(gen_ids, skip_special_tokens=True).strip()
-        lines = [l.strip() for l in re.split(r'[\n\r]+', text) if l.strip()]
-        if require_question:
-            q_lines = [l for l in lines if '?' in l and len(l) < 250]
-            if q_lines:
-                return q_lines[0]
-            # tweak prompt and retry
-            prompt = prompt + "\nPlease respond with only a single concise question sentence (end with '?')."
-            continue
-        return lines[0] if lines else text
-    return ""
+    # CLI prompts carry their own interviewer persona
+    text = ask_llm(prompt, max_new_tokens=max_new_tokens, require_question=require_question, system_prompt=None)
+    if require_question:
+        return text if '?' in text and len(text) < 250 else ""
+    lines = [l.strip() for l in re.split(r'[\n\r]+', text) if l.strip()]
+    return lines[0] if lines else text
 
 
 # ----------------------------
-# Role banks (unchanged)
+# Roles (questions come from the shared question bank)
 # ----------------------------
-ROLE_BANK = {
-    "software": [
-        "Describe how a hash table works and an example use-case.",
-        "What is the time complexity of searching in a balanced BST?",
-        "Explain how to reverse a singly linked list (describe steps).",
-        "Difference between stack and queue with an example.",
-        "How does HTTPS differ from HTTP in basic terms?",
-        "Given an array, how to find longest subarray with sum zero? Outline approach.",
-        "How to detect cycles in a directed graph?"
-    ],
-    "analytics": [
-        "What is mean vs median and when to use each?",
-        "How do you handle missing values: name two methods.",
-        "Write a simple SQL query to find total sales per month.",
-        "What is a p-value in one sentence?",
-        "How to design a basic A/B test and check significance?"
-    ],
-    "custom": [
-        "Tell me briefly what areas you want to practice."
-    ]
-}
-
 ROLE_KEYS = {
     "software": ["software","developer","engineer","backend","frontend","fullstack","swe","programmer","development"],
     "analytics": ["analytics","analyst","data","business intelligence","bi","data analyst"],
@@ -278,18 +217,6 @@ def extract_role(sentence):
         return " ".join(words)
     return " ".join(words[-3:])
 
-def detect_user_type_final(transcript):
-    text = (transcript or "").lower()
-    words = len(text.split())
-    if words < 50:
-        return "Efficient"
-    if words > 400:
-        return "Chatty"
-    if "don't know" in text or "not sure" in text:
-        return "Confused"
-    return "Efficient"
-
-
 # ----------------------------
 # Interview flow prompts
 # ----------------------------
@@ -300,6 +227,18 @@ SYSTEM_FU_PROMPT = ("You are a concise professional interviewer. "
                     "Produce ONLY a single follow-up question sentence that requests a missing specific detail related to the user's answer. "
                     "Do NOT repeat the user's words; ask for a concrete metric, method, small example, complexity, or clarification.")
 
+GREETING = "Hello — I am your interview practice partner. Which role would you like to practice for?"
+FEEDBACK_NOTICE = "Generating your final feedback now."
+FALLBACK_FOLLOWUPS = {
+    "software":"Can you give the time and space complexity of your approach?",
+    "analytics":"Which metric would you track to verify this change worked?",
+    "custom":"Can you clarify which detail I should probe?"
+}
+DEFAULT_FOLLOWUP = "Can you clarify one concrete metric or example?"
+
+# fixed lines, synthesized once and then served from the TTS cache
+STATIC_PHRASES = [GREETING, FEEDBACK_NOTICE, DEFAULT_FOLLOWUP, *FALLBACK_FOLLOWUPS.values()]
+
 def sanitize_question(q: str) -> str:
     q = (q or "").strip()
     q = re.sub(r'^(Question[:\-]*\s*)','', q, flags=re.I)
@@ -312,29 +251,28 @@ def sanitize_question(q: str) -> str:
 # Main
 # ----------------------------
 def main():
+    # Whisper and Qwen load while the greeting plays
+    model_runtime.warm_up()
+    threading.Thread(target=warm_tts_cache, args=(STATIC_PHRASES,), daemon=True).start()
     try:
-        greet = "Hello — I am your interview practice partner. Which role would you like to practice for?"
+        greet = GREETING
         print("AI:", greet)
         speak(greet)
 
         # role capture
-        rpath = record_until_silence("role.wav", timeout=30)
-        role_sentence = transcribe(rpath)
+        role_sentence = listen_and_transcribe(timeout=30)
         print("Transcribed role sentence:", role_sentence)
         role_name = extract_role(role_sentence)
         role_key = map_role_to_key(role_name)
         print(f"Selected role: '{role_name}' -> {role_key}")
         speak(f"Great. We'll practice for the {role_name} role. I'll ask a few focused questions.")
 
-        bank = ROLE_BANK.get(role_key, ROLE_BANK["custom"])
-        qpool = list(bank)
-        random.shuffle(qpool)
-        questions = qpool[:MAX_MAIN_QUESTIONS]
+        questions = question_bank.sample(role_key, MAX_MAIN_QUESTIONS) or question_bank.sample("custom", MAX_MAIN_QUESTIONS)
 
         history = []
         for idx, base in enumerate(questions, start=1):
             q_prompt = SYSTEM_Q_PROMPT + f"\nBase: {base}\nRole: {role_name}\nRespond with ONLY one clear question sentence."
-            q_text = generate_llm_guarded(q_prompt, max_new_tokens=QUESTION_GEN_TOKENS, temperature=0.18, retries=2, require_question=True)
+            q_text = generate_llm_guarded(q_prompt, max_new_tokens=QUESTION_GEN_TOKENS, temperature=0.18, require_question=True)
             if not q_text:
                 q_text = base
             q_text = sanitize_question(q_text)
@@ -342,41 +280,34 @@ def main():
             speak(q_text)
             history.append(("assistant", q_text))
 
-            a_path = record_until_silence(f"answer_{idx}.wav", timeout=90)
-            a_text = transcribe(a_path)
+            a_text = listen_and_transcribe(timeout=90)
             print("You:", a_text)
             history.append(("user", a_text))
 
             fu_prompt = SYSTEM_FU_PROMPT + f"\nUserAnswer:\n\"\"\"\n{a_text}\n\"\"\"\nRole: {role_name}\nInstruction: Ask a single concise follow-up for a missing specific detail."
-            fu_text = generate_llm_guarded(fu_prompt, max_new_tokens=FOLLOWUP_GEN_TOKENS, temperature=0.18, retries=2, require_question=True)
+            fu_text = generate_llm_guarded(fu_prompt, max_new_tokens=FOLLOWUP_GEN_TOKENS, temperature=0.18, require_question=True)
             if not fu_text or "NO_FOLLOWUP" in (fu_text or "").upper():
-                fallback = {
-                    "software":"Can you give the time and space complexity of your approach?",
-                    "analytics":"Which metric would you track to verify this change worked?",
-                    "custom":"Can you clarify which detail I should probe?"
-                }
-                fu_text = fallback.get(role_key, "Can you clarify one concrete metric or example?")
+                fu_text = FALLBACK_FOLLOWUPS.get(role_key, DEFAULT_FOLLOWUP)
             fu_text = sanitize_question(fu_text)
             print("AI (follow-up):", fu_text)
             speak(fu_text)
             history.append(("assistant", fu_text))
 
-            fu_path = record_until_silence(f"fu_{idx}.wav", timeout=60)
-            fu_ans = transcribe(fu_path)
+            fu_ans = listen_and_transcribe(timeout=60)
             print("You (follow-up):", fu_ans)
             history.append(("user", fu_ans))
 
         transcript_all = "\n".join([f"{r}: {t}" for r,t in history])
-        user_type = detect_user_type_final(transcript_all)
+        user_type = detect_user_type(transcript_all)
         print("\nAI: Generating final feedback...")
-        speak("Generating your final feedback now.")
+        speak(FEEDBACK_NOTICE)
 
         fb_prompt = (f"You are a professional interviewer. Role: {role_name}. Candidate transcript:\n{transcript_all}\n\n"
                      "Provide structured feedback with numeric scores (0-10) for: Communication, Role Knowledge, Problem Solving, Conciseness. "
                      "Give 3 concrete improvement suggestions and one concise improved example answer for the weakest point. "
                      f"Also summarize the candidate type as one of: Confused, Efficient, Chatty, Edge-case. Candidate type: {user_type}.\n"
                      "Respond professionally, do NOT include any meta or labels besides the requested items.")
-        feedback = generate_llm_guarded(fb_prompt, max_new_tokens=FEEDBACK_GEN_TOKENS, temperature=0.2, retries=2, require_question=False)
+        feedback = generate_llm_guarded(fb_prompt, max_new_tokens=FEEDBACK_GEN_TOKENS, temperature=0.2, require_question=False)
         print("\n=== FEEDBACK ===\n")
         print(feedback)
         speak("Here is your final feedback. " + feedback)
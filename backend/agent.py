@@ -1,52 +1,122 @@
-from llm_engine import ask_llm
+from llm_engine import ask_llm, register_prefix, SYSTEM_PROMPT
 from tts_engine import synthesize_mp3_bytes
-from config import MAX_QUESTIONS
-import random
-
-ROLE_BANK = {
-    "software": [
-        "Explain how a hash table works.",
-        "What is the time complexity of searching in a balanced BST?",
-        "Explain how to reverse a singly linked list.",
-        "How to detect cycles in a directed graph?"
-    ],
-    "analytics": [
-        "What is mean vs median?",
-        "How to handle missing values?",
-        "Write a SQL query for total sales per month."
-    ],
-    "sales": [
-        "Explain how you would handle an objection from a customer.",
-        "What is your approach to closing a high-value deal?",
-        "Describe how you qualify a lead."
-    ],
-    "retail": [
-        "How would you handle an angry customer?",
-        "What steps do you take to ensure correct billing?",
-        "How do you manage store inventory accurately?"
-    ],
-    "product": [
-        "What is a product roadmap?",
-        "How do you prioritize features?",
-        "Explain MVP in product development."
-    ],
-    "support": [
-        "How do you communicate with a frustrated customer?",
-        "Explain your escalation strategy.",
-        "How do you handle repeated complaints?"
-    ],
-    "hr": [
-        "How do you conduct a candidate screening?",
-        "Explain structured interview vs unstructured interview.",
-        "How do you evaluate culture fit?"
-    ],
-    "marketing": [
-        "Explain the basics of a marketing funnel.",
-        "How do you measure campaign success?",
-        "Describe your approach to customer segmentation."
-    ],
-    "custom": ["Tell me what area you want to practice."]
-}
+from tts_pipeline import SentenceTTSPipeline
+from question_cache import QuestionCache, content_hash
+from question_bank import question_bank
+from stage_dag import StageDAG
+from utils import detect_user_type
+from config import MAX_QUESTIONS, MODEL_NAME, EDGE_VOICE, QUESTION_CACHE_DIR, QUESTION_CACHE_MB
+from config import PREFETCH_NEXT_QUESTION, PREFETCH_WORKERS, FEEDBACK_USER_TYPE
+from config import LLM_BACKEND, TTS_BACKEND, LLM_PRECISION, LLM_DRAFT_MODEL
+from config import QUESTION_TAG, QUESTION_MAX_DIFFICULTY, PRECOMPUTE_QUESTIONS_PER_ROLE
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+# Constant heads of the question / follow-up prompts. Everything up to the
+# trailing ':' is identical on every call, so its KV cache is built once.
+QUESTION_PREAMBLE = """
+Turn the following into a single crisp interview question.
+Rules:
+- No examples.
+- No explanations.
+- No rephrasing meta-text.
+- Only output the question itself.
+
+Question:"""
+
+FOLLOWUP_PREAMBLE = """
+You are an interviewer. Generate ONE follow-up question ONLY if needed.
+
+Rules:
+- Must ask for a missing technical detail *related to the question asked*.
+- Do NOT ask behavioral questions like "challenges you faced".
+- Do NOT ask meta-questions like "could you elaborate more".
+- Follow-up must be specific and technical.
+- If user answer is already complete, ask a clarifying detail.
+- Do NOT output anything except the question.
+
+User answer:"""
+
+register_prefix(QUESTION_PREAMBLE)
+register_prefix(FOLLOWUP_PREAMBLE)
+
+GREETING = "Hello, I am your interview partner. Which role would you like to practice?"
+# asked when the model's follow-up contains no usable question
+DEFAULT_FOLLOWUP = "Can you walk me through one concrete example of that?"
+
+# fixed lines the agent speaks; warmed into the TTS cache at server start
+STATIC_PHRASES = [GREETING, DEFAULT_FOLLOWUP]
+
+# Bank questions are rewritten with do_sample=False, so each one always gives
+# the same text: rewrite once, keep text + audio, look it up afterwards.
+# Entries are keyed by the raw question, so growing the bank keeps them valid.
+# Precision and the draft model are part of the key: int8/bf16 (and assisted
+# decoding's different numerics) can change the greedy output.
+question_cache = QuestionCache(
+    QUESTION_CACHE_DIR,
+    content_hash(MODEL_NAME, SYSTEM_PROMPT, QUESTION_PREAMBLE, EDGE_VOICE, LLM_BACKEND, TTS_BACKEND,
+                 LLM_PRECISION, LLM_DRAFT_MODEL, "first-question"),
+    QUESTION_CACHE_MB * 1024 * 1024
+)
+
+def rewrite_question(q_raw: str, on_token=None, cancel=None):
+    """
+    Return (question text, mp3) for a bank entry, generating it only on a cache miss.
+    Setting `cancel` (a threading.Event) stops the LLM mid-question; the result is then None.
+    """
+    hit = question_cache.get(q_raw)
+    if hit is not None:
+        if on_token is not None:
+            on_token(hit[0])
+        return hit
+
+    text = ask_llm(QUESTION_PREAMBLE + f" {q_raw}\n", max_new_tokens=50, require_question=True,
+                   on_token=on_token, cancel=cancel)
+    if cancel is not None and cancel.is_set():
+        return None   # cut short: nothing worth speaking or caching
+    if not text:
+        text = q_raw   # no usable rewrite: ask the bank question as written
+    mp3 = synthesize_mp3_bytes(text)
+    question_cache.put(q_raw, text, mp3)
+    return text, mp3
+
+def classify_user_type(transcript: str) -> str:
+    if FEEDBACK_USER_TYPE != "llm":
+        return detect_user_type(transcript)
+
+    type_prompt = f"""
+Based on this interview transcript, classify the user as exactly one of:
+- Confused
+- Efficient
+- Chatty
+- Edge-case
+
+Transcript: {transcript}
+
+Answer ONLY the type name.
+"""
+    return ask_llm(type_prompt, max_new_tokens=8)
+
+# background rewrites of the upcoming question, shared by all sessions
+_prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="q-prefetch")
+
+def precompute_question_cache():
+    total = 0
+    for role in question_bank.roles():
+        for q_raw in question_bank.iter_texts(role, PRECOMPUTE_QUESTIONS_PER_ROLE):
+            try:
+                rewrite_question(q_raw)
+                total += 1
+            except Exception as e:
+                print("Question precompute error:", e)
+    print(f"Question cache ready ({total} bank questions) -> {question_cache.dir}")
+
+def pick_questions(role: str, n: int):
+    """n distinct bank questions for the role, honouring QUESTION_TAG / QUESTION_MAX_DIFFICULTY when it can."""
+    picked = question_bank.sample(role, n, tag=QUESTION_TAG, max_difficulty=QUESTION_MAX_DIFFICULTY)
+    if not picked and (QUESTION_TAG is not None or QUESTION_MAX_DIFFICULTY is not None):
+        picked = question_bank.sample(role, n)
+    return picked or question_bank.sample("custom", n)
 
 def match_role_text(text: str):
     t = (text or "").lower()
@@ -70,40 +140,72 @@ class InterviewAgent:
         self.questions = []
         self.q_index = 0
         self.history = []
+        self._prefetch = None     # (q_index, Future, cancel Event) for the next main question
+        # guards _prefetch: the registry may close() an evicted session while a turn is running
+        self._prefetch_lock = threading.Lock()
+
+
+    # ===================== SNAPSHOT =====================
+    def snapshot(self) -> dict:
+        """Everything needed to resume this interview in another process (background work is not kept)."""
+        return {
+            "v": 1,
+            "state": self.state,
+            "role": self.role_key,
+            "questions": list(self.questions),
+            "q": self.q_index,
+            "history": [list(turn) for turn in self.history],
+        }
+
+    @classmethod
+    def from_snapshot(cls, snap: dict):
+        agent = cls()
+        agent.state = snap["state"]
+        agent.role_key = snap["role"]
+        agent.questions = list(snap["questions"])
+        agent.q_index = snap["q"]
+        agent.history = [tuple(turn) for turn in snap["history"]]
+        return agent
 
 
     def start(self):
+        self.close()
         self.state = "await_role"
-        text = "Hello, I am your interview partner. Which role would you like to practice?"
+        text = GREETING
         mp3 = synthesize_mp3_bytes(text)
         return {
             "ai_text": text,
-            "ai_audio_b64": mp3.hex(),
+            "ai_audio": mp3,
             "expect_more": True
         }
 
 
-    def process_audio_text(self, text: str):
+    def process_audio_text(self, text: str, on_token=None, on_audio=None):
+        """
+        Advance the interview with the candidate's transcribed reply.
+        `on_token`, if given, receives the interviewer's text while it is generated.
+        `on_audio(index, text, mp3)`, if given, receives the speech in ordered
+        chunks instead of one `ai_audio` blob in the response.
+        """
         text = (text or "").strip()
         print("Agent received text:", text)
 
         # ---------------- ROLE SELECTION ----------------
         if self.state == "await_role":
             self.role_key = match_role_text(text)
-            bank = ROLE_BANK[self.role_key]
 
-            # pick 3 random questions
-            self.questions = random.sample(bank, min(MAX_QUESTIONS, len(bank)))
+            # pick 3 random questions, none repeated
+            self.questions = pick_questions(self.role_key, MAX_QUESTIONS)
             self.q_index = 0
             self.state = "ask_q"
 
-            return self.ask_question()
+            return self.ask_question(on_token, on_audio)
 
 
         # ---------------- FIRST ANSWER TO MAIN QUESTION ----------------
         if self.state == "await_answer":
             self.history.append(("user", text))
-            return self.generate_followup(text)
+            return self.generate_followup(text, on_token, on_audio)
 
 
         # ---------------- ANSWER TO FOLLOWUP ----------------
@@ -112,9 +214,9 @@ class InterviewAgent:
             self.q_index += 1
 
             if self.q_index >= len(self.questions):
-                return self.final_feedback()
+                return self.final_feedback(on_token, on_audio)
 
-            return self.ask_question()
+            return self.ask_question(on_token, on_audio)
 
         # fallback
         return self.start()
@@ -122,85 +224,51 @@ class InterviewAgent:
 
 
     # ===================== ASK QUESTION =====================
-    def ask_question(self):
+    def ask_question(self, on_token=None, on_audio=None):
         q_raw = self.questions[self.q_index]
 
-        prompt = f"""
-Turn the following into a single crisp interview question.
-Rules:
-- No examples.
-- No explanations.
-- No rephrasing meta-text.
-- Only output the question itself.
-
-Question: {q_raw}
-"""
-
-        q_clean = ask_llm(prompt, max_new_tokens=50)
+        ready = self._take_prefetched(self.q_index)
+        if ready is not None:
+            q_clean, mp3 = ready
+            if on_token is not None:
+                on_token(q_clean)
+        else:
+            q_clean, mp3 = rewrite_question(q_raw, on_token)
         self.history.append(("assistant", q_clean))
 
-        mp3 = synthesize_mp3_bytes(q_clean)
         self.state = "await_answer"
-
-        return {
-            "ai_text": q_clean,
-            "ai_audio_b64": mp3.hex(),
-            "expect_more": True
-        }
+        # the candidate now talks for a while: get the next question ready meanwhile
+        self._prefetch_next()
+        return self._reply(q_clean, True, on_audio, mp3)
 
 
 
     # ===================== FOLLOW-UP =====================
-    def generate_followup(self, user_answer):
-        prompt = f"""
-You are an interviewer. Generate ONE follow-up question ONLY if needed.
-
-Rules:
-- Must ask for a missing technical detail *related to the question asked*.
-- Do NOT ask behavioral questions like "challenges you faced".
-- Do NOT ask meta-questions like "could you elaborate more".
-- Follow-up must be specific and technical.
-- If user answer is already complete, ask a clarifying detail.
-- Do NOT output anything except the question.
-
-User answer: {user_answer}
-"""
+    def generate_followup(self, user_answer, on_token=None, on_audio=None):
+        prompt = FOLLOWUP_PREAMBLE + f" {user_answer}\n"
 
-        followup = ask_llm(prompt, max_new_tokens=50)
+        followup = ask_llm(prompt, max_new_tokens=50, require_question=True, on_token=on_token)
+        if not followup:
+            followup = DEFAULT_FOLLOWUP
 
         self.history.append(("assistant", followup))
-        mp3 = synthesize_mp3_bytes(followup)
 
         self.state = "await_followup"
-
-        return {
-            "ai_text": followup,
-            "ai_audio_b64": mp3.hex(),
-            "expect_more": True
-        }
+        return self._reply(followup, True, on_audio)
 
 
 
     # ===================== FINAL FEEDBACK =====================
-    def final_feedback(self):
+    def final_feedback(self, on_token=None, on_audio=None):
+        """
+        Stages run as a DAG so nothing waits on work it doesn't need:
+        the user-type label and the feedback text are independent (the label
+        is appended afterwards instead of being baked into the prompt), and
+        with `on_audio` the speech is synthesized while the feedback streams.
+        """
+        self.close()
         transcript = "\n".join([f"{r}: {t}" for r, t in self.history])
 
-        # Determine user type
-        type_prompt = f"""
-Based on this interview transcript, classify the user as exactly one of:
-- Confused
-- Efficient
-- Chatty
-- Edge-case
-
-Transcript: {transcript}
-
-Answer ONLY the type name.
-"""
-        user_type = ask_llm(type_prompt)
-
-
-
         fb_prompt = f"""
 Give final interview feedback based on this transcript.
 
@@ -214,16 +282,112 @@ Include:
 - Conciseness score
 - Strengths
 - Areas for improvement
-- Final classification: {user_type}
 """
 
-        feedback = ask_llm(fb_prompt, max_new_tokens=220)
-        mp3 = synthesize_mp3_bytes(feedback)
+        # long output: speak it sentence by sentence while it is still generating
+        pipeline = SentenceTTSPipeline(on_audio) if on_audio is not None else None
+
+        def feedback_stage(_):
+            if pipeline is None:
+                return ask_llm(fb_prompt, max_new_tokens=220, on_token=on_token)
+
+            def tee(piece):
+                pipeline.feed(piece)
+                if on_token is not None:
+                    on_token(piece)
+
+            return ask_llm(fb_prompt, max_new_tokens=220, on_token=tee)
+
+        def compose_stage(r):
+            return f"{r['feedback']}\n\nFinal classification: {r['user_type']}"
+
+        def speech_stage(r):
+            if pipeline is None:
+                return synthesize_mp3_bytes(r["compose"])
+            # the feedback itself is already queued for speech; add the label and drain
+            pipeline.feed(f"\nFinal classification: {r['user_type']}.")
+            pipeline.close()
+            return b""
+
+        dag = StageDAG()
+        dag.add("user_type", lambda _: classify_user_type(transcript))
+        dag.add("feedback", feedback_stage)
+        dag.add("compose", compose_stage, deps=("feedback", "user_type"))
+        dag.add("speech", speech_stage, deps=("compose",))
+        try:
+            results, timings = dag.run()
+        finally:
+            if pipeline is not None:
+                pipeline.close()
+        print("Final feedback timings (ms):", timings)
 
         self.state = "done"
+        return {
+            "ai_text": results["compose"],
+            "ai_audio": results["speech"],
+            "expect_more": False,     # ❗ Tells frontend to STOP
+            "timings": timings
+        }
 
+
+    # ===================== SPECULATIVE NEXT QUESTION =====================
+    def _prefetch_next(self):
+        nxt = self.q_index + 1
+        if not PREFETCH_NEXT_QUESTION or nxt >= len(self.questions):
+            return
+        cancelled = threading.Event()
+        q_raw = self.questions[nxt]
+
+        def job():
+            if cancelled.is_set():
+                return None
+            return rewrite_question(q_raw, cancel=cancelled)
+
+        with self._prefetch_lock:
+            if self._prefetch is not None and self._prefetch[0] == nxt:
+                return
+            self._cancel_prefetch()
+            self._prefetch = (nxt, _prefetch_pool.submit(job), cancelled)
+
+    def _take_prefetched(self, index):
+        with self._prefetch_lock:
+            if self._prefetch is None or self._prefetch[0] != index:
+                return None
+            _, fut, _ = self._prefetch
+            self._prefetch = None
+        if fut.cancel():
+            # still queued behind other sessions' prefetches: faster to generate live
+            return None
+        try:
+            return fut.result()
+        except Exception as e:
+            print("Prefetched question failed, generating live:", e)
+            return None
+
+    def close(self):
+        """Drop any background work for this session (session ended, restarted or evicted)."""
+        with self._prefetch_lock:
+            self._cancel_prefetch()
+
+    def _cancel_prefetch(self):
+        # called with _prefetch_lock held
+        if self._prefetch is None:
+            return
+        _, fut, cancelled = self._prefetch
+        self._prefetch = None
+        cancelled.set()   # also stops an LLM generation already under way
+        fut.cancel()
+
+
+    # ===================== RESPONSE =====================
+    def _reply(self, text, expect_more, on_audio=None, mp3=None):
+        if mp3 is None:
+            mp3 = synthesize_mp3_bytes(text)
+        if on_audio is not None:
+            on_audio(0, text, mp3)
+            mp3 = b""
         return {
-            "ai_text": feedback,
-            "ai_audio_b64": mp3.hex(),
-            "expect_more": False     # ❗ Tells frontend to STOP
+            "ai_text": text,
+            "ai_audio": mp3,
+            "expect_more": expect_more
         }
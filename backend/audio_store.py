@@ -0,0 +1,48 @@
+# backend/audio_store.py
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from config import AUDIO_STORE_MB, AUDIO_STORE_TTL
+
+
+class AudioStore:
+    """
+    Short-lived MP3 clips served from /api/audio/{id}.
+    Clips expire after `ttl` seconds and the oldest are dropped once the total
+    exceeds `max_bytes`. Each clip is held once and streamed out in slices.
+    """
+
+    def __init__(self, max_bytes: int = AUDIO_STORE_MB * 1024 * 1024, ttl: float = AUDIO_STORE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clips = OrderedDict()   # id -> (created, bytes), oldest first
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, data: bytes) -> str:
+        audio_id = uuid.uuid4().hex
+        with self._lock:
+            self._evict(time.monotonic())
+            self._clips[audio_id] = (time.monotonic(), data)
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._clips) > 1:
+                _, (_, old) = self._clips.popitem(last=False)
+                self._size -= len(old)
+        return audio_id
+
+    def get(self, audio_id: str) -> Optional[bytes]:
+        with self._lock:
+            self._evict(time.monotonic())
+            item = self._clips.get(audio_id)
+            return item[1] if item else None
+
+    def _evict(self, now):
+        while self._clips:
+            audio_id, (created, data) = next(iter(self._clips.items()))
+            if now - created < self.ttl:
+                break
+            self._clips.popitem(last=False)
+            self._size -= len(data)
@@ -0,0 +1,193 @@
+# backend/bench.py
+# End-to-end interview benchmark: latency per stage and per turn, and sessions/sec.
+#   cd backend && python bench.py                              # fake models, agent only
+#   cd backend && python bench.py --target app --concurrency 8 # through the FastAPI routes
+#   cd backend && python bench.py --backends real              # the configured models
+# Fake backends sleep for the FAKE_* latencies in config.py (override with --llm-token-ms etc.).
+import io
+import sys
+import json
+import time
+import wave
+import asyncio
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import config
+
+ROLE_ANSWER = "I want to practice for a software engineer role"
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    i = min(len(values) - 1, max(0, int(round(q / 100.0 * (len(values) - 1)))))
+    return values[i]
+
+
+def speech_like(seconds: float, sr: int = config.SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """Voiced bursts with short gaps, then a silent tail like the recorder leaves."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    envelope = (np.sin(2 * np.pi * 1.5 * t) > -0.6).astype(np.float32)
+    voiced = 0.1 * np.sin(2 * np.pi * 180 * t) * envelope + 0.002 * rng.standard_normal(len(t))
+    tail = 0.002 * rng.standard_normal(int(1.0 * sr))
+    return np.concatenate([voiced, tail]).astype(np.float32)
+
+
+def wav_bytes(audio: np.ndarray, sr: int = config.SAMPLE_RATE) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes((np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def configure(args):
+    """Patch config before any engine module imports its settings."""
+    if args.backends == "fake":
+        config.LLM_BACKEND, config.STT_BACKEND, config.TTS_BACKEND = "fake", "fake", "fake"
+    for name in ("llm_prefill_ms", "llm_token_ms", "stt_base_ms", "stt_rtf", "tts_base_ms", "tts_char_ms"):
+        value = getattr(args, name)
+        if value is not None:
+            setattr(config, "FAKE_" + name.upper(), value)
+    # keep benchmark output out of the real caches
+    config.QUESTION_CACHE_DIR = tempfile.mkdtemp(prefix="bench-qcache-")
+    config.TTS_CACHE_DIR = None
+    config.PRECOMPUTE_QUESTIONS_ON_STARTUP = False
+
+
+# ===================== AGENT =====================
+def run_agent_session(i: int, answer_seconds: float, turns: list):
+    from agent import InterviewAgent
+    from stt_engine import transcribe_array
+
+    agent = InterviewAgent()
+    t0 = time.perf_counter()
+    res = agent.start()
+    turns.append(("start", time.perf_counter() - t0))
+
+    answer = speech_like(answer_seconds, seed=i)
+    n = 0
+    while res.get("expect_more"):
+        t0 = time.perf_counter()
+        text = ROLE_ANSWER if n == 0 else transcribe_array(answer)
+        res = agent.process_audio_text(text)
+        turns.append(("role" if n == 0 else "answer", time.perf_counter() - t0))
+        n += 1
+    agent.close()
+
+
+def bench_agent(args, turns: list):
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(lambda i: run_agent_session(i, args.answer_seconds, turns), range(args.sessions)))
+
+
+# ===================== APP =====================
+async def run_app_session(client, i: int, answer_seconds: float, turns: list):
+    t0 = time.perf_counter()
+    r = await client.post("/api/start")
+    r.raise_for_status()
+    res = r.json()
+    turns.append(("start", time.perf_counter() - t0))
+    sid = res["session_id"]
+
+    # the first clip is short so fake STT output stays on the role answer's length
+    clips = [wav_bytes(speech_like(2.0, seed=i)), wav_bytes(speech_like(answer_seconds, seed=i))]
+    n = 0
+    while res.get("expect_more"):
+        t0 = time.perf_counter()
+        r = await client.post(
+            "/api/send_audio",
+            files={"audio": ("answer.wav", clips[min(n, 1)], "audio/wav")},
+            data={"session_id": sid}
+        )
+        r.raise_for_status()
+        res = r.json()
+        turns.append(("role" if n == 0 else "answer", time.perf_counter() - t0))
+        n += 1
+    await client.post("/api/end", data={"session_id": sid})
+
+
+async def bench_app(args, turns: list):
+    import httpx
+    from main import app
+
+    sem = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i):
+            async with sem:
+                await run_app_session(client, i, args.answer_seconds, turns)
+        await asyncio.gather(*(one(i) for i in range(args.sessions)))
+
+
+# ===================== REPORT =====================
+def summarize(turns, stage_samples, wall: float, sessions: int) -> dict:
+    def dist(values):
+        ms = [1000 * v for v in values]
+        return {"n": len(ms), "p50": percentile(ms, 50), "p95": percentile(ms, 95), "p99": percentile(ms, 99)}
+
+    by_kind = {}
+    for kind, seconds in turns:
+        by_kind.setdefault(kind, []).append(seconds)
+    return {
+        "sessions": sessions,
+        "wall_s": round(wall, 2),
+        "sessions_per_s": round(sessions / wall, 3) if wall else 0.0,
+        "turns": {k: dist(v) for k, v in sorted(by_kind.items())},
+        "all_turns": dist([s for _, s in turns]),
+        "stages": {k: dist(v) for k, v in sorted(stage_samples.items())},
+    }
+
+
+def print_report(report: dict):
+    print(f"\n{report['sessions']} sessions in {report['wall_s']}s -> {report['sessions_per_s']} sessions/s")
+    print(f"{'':<18}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = [("turn:" + k, v) for k, v in report["turns"].items()] + [("turn:all", report["all_turns"])]
+    rows += [("stage:" + k, v) for k, v in report["stages"].items()]
+    for name, d in rows:
+        print(f"{name:<18}{d['n']:>6}{d['p50']:>10.1f}{d['p95']:>10.1f}{d['p99']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interview latency / throughput benchmark")
+    parser.add_argument("--target", choices=("agent", "app"), default="agent")
+    parser.add_argument("--backends", choices=("fake", "real"), default="fake")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--answer-seconds", type=float, default=8.0)
+    parser.add_argument("--llm-prefill-ms", type=float)
+    parser.add_argument("--llm-token-ms", type=float)
+    parser.add_argument("--stt-base-ms", type=float)
+    parser.add_argument("--stt-rtf", type=float)
+    parser.add_argument("--tts-base-ms", type=float)
+    parser.add_argument("--tts-char-ms", type=float)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    configure(args)
+    import metrics
+    metrics.collect_samples()
+
+    turns = []
+    start = time.perf_counter()
+    if args.target == "agent":
+        bench_agent(args, turns)
+    else:
+        asyncio.run(bench_app(args, turns))
+    wall = time.perf_counter() - start
+
+    report = summarize(turns, metrics.samples(), wall, args.sessions)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=1)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
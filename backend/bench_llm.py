@@ -0,0 +1,168 @@
+# backend/bench_llm.py
+# Compare load time, decode speed and resident memory across LLM precisions.
+#   cd backend && python bench_llm.py --modes fp32,bf16,int8 --tokens 64
+# Each mode runs in its own process so memory numbers don't overlap.
+# Speculative decoding: plain vs draft-assisted greedy decoding on the same prompts.
+#   cd backend && python bench_llm.py --draft Qwen/Qwen2.5-0.5B-Instruct --modes int8
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+PROMPT = "Turn the following into a single crisp interview question.\nQuestion: Explain how a hash table works.\n"
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_mode(precision: str, tokens: int, runs: int) -> dict:
+    import torch
+    from transformers import AutoTokenizer
+    from config import MODEL_NAME
+    from precision import load_qwen
+
+    t0 = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model, resolved = load_qwen(MODEL_NAME, precision)
+    load_s = time.perf_counter() - t0
+
+    inputs = tokenizer(PROMPT, return_tensors="pt")
+    speeds = []
+    with torch.no_grad():
+        for i in range(runs + 1):
+            start = time.perf_counter()
+            out = model.generate(
+                **inputs,
+                max_new_tokens=tokens,
+                min_new_tokens=tokens,    # fixed length so modes are comparable
+                do_sample=False,
+                pad_token_id=tokenizer.eos_token_id
+            )
+            n = out.shape[1] - inputs["input_ids"].shape[1]
+            if i > 0:                     # first run is warm-up
+                speeds.append(n / (time.perf_counter() - start))
+
+    return {
+        "precision": resolved,
+        "load_s": round(load_s, 1),
+        "tok_per_s": round(sorted(speeds)[len(speeds) // 2], 2),
+        "peak_rss_mb": round(_rss_mb()),
+    }
+
+
+DRAFT_PROMPTS = [
+    PROMPT,
+    "Turn the following into a single crisp interview question.\nQuestion: How do you prioritize features?\n",
+    "You are an interviewer. Generate ONE follow-up question ONLY if needed.\n"
+    "User answer: I would use a queue and process the graph level by level.\n",
+    "Give final interview feedback based on this transcript.\nTranscript:\n"
+    "assistant: What is mean vs median?\nuser: Mean is the average, median is the middle value.\n",
+]
+
+
+def _count_calls(model) -> list:
+    calls = [0]
+
+    def hook(*_):
+        calls[0] += 1
+
+    model.register_forward_pre_hook(hook)
+    return calls
+
+
+def run_draft(precision: str, draft_name: str, tokens: int) -> dict:
+    """
+    Same greedy generations with and without the draft model. Acceptance is
+    estimated from forward passes: every verification step of the main model
+    yields its accepted draft tokens plus one of its own.
+    """
+    import torch
+    from transformers import AutoTokenizer
+    from config import MODEL_NAME, LLM_DRAFT_TOKENS
+    from precision import load_qwen
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model, resolved = load_qwen(MODEL_NAME, precision)
+    draft, _ = load_qwen(draft_name, "int8" if resolved == "prequantized" else resolved)
+    draft.generation_config.num_assistant_tokens = LLM_DRAFT_TOKENS
+    main_calls, draft_calls = _count_calls(model), _count_calls(draft)
+
+    def generate(inputs, assistant):
+        with torch.no_grad():
+            return model.generate(
+                **inputs, max_new_tokens=tokens, do_sample=False,
+                pad_token_id=tokenizer.eos_token_id, assistant_model=assistant
+            )
+
+    plain_s = assisted_s = 0.0
+    new_tokens = main_steps = drafted = 0
+    identical = True
+    generate(tokenizer(PROMPT, return_tensors="pt"), draft)   # warm-up both paths
+    for prompt in DRAFT_PROMPTS:
+        inputs = tokenizer(prompt, return_tensors="pt")
+        start = time.perf_counter()
+        plain = generate(inputs, None)
+        plain_s += time.perf_counter() - start
+
+        main_calls[0] = draft_calls[0] = 0
+        start = time.perf_counter()
+        assisted = generate(inputs, draft)
+        assisted_s += time.perf_counter() - start
+
+        n = assisted.shape[1] - inputs["input_ids"].shape[1]
+        new_tokens += n
+        main_steps += main_calls[0]
+        drafted += draft_calls[0]
+        identical = identical and torch.equal(plain, assisted)
+
+    return {
+        "precision": resolved,
+        "plain_tok_per_s": round(new_tokens / plain_s, 2),
+        "assisted_tok_per_s": round(new_tokens / assisted_s, 2),
+        "speedup": round(plain_s / assisted_s, 2),
+        "tokens_per_main_step": round(new_tokens / max(1, main_steps), 2),
+        "acceptance_rate": round(max(0, new_tokens - main_steps) / max(1, drafted), 2),
+        "identical_output": identical,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", default="fp32,bf16,int8")
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--draft", help="compare speculative decoding with this draft model instead")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.draft:
+        for mode in args.modes.split(","):
+            print(mode, json.dumps(run_draft(mode, args.draft, args.tokens)))
+        return
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.tokens, args.runs)))
+        return
+
+    print(f"{'mode':<14}{'load s':>8}{'tok/s':>9}{'peak MB':>10}")
+    for mode in args.modes.split(","):
+        proc = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--tokens", str(args.tokens), "--runs", str(args.runs)],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{mode:<14}failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        label = mode if r["precision"] == mode else f"{mode}->{r['precision']}"
+        print(f"{label:<14}{r['load_s']:>8}{r['tok_per_s']:>9}{r['peak_rss_mb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 # backend/config.py
+import os
+
 MODEL_NAME = "Qwen/Qwen2.5-3B-Instruct"
 WHISPER_MODEL = "small"               # whisper model id used by whisper.load_model
 EDGE_VOICE = "en-IN-NeerjaNeural"     # chosen Neerja voice
@@ -11,3 +13,99 @@ BLOCKSIZE = 1024
 MAX_QUESTIONS = 3        # fixed to 3 questions per session
 SILENCE_DURATION = 6.0   # stop after 6 seconds of sustained silence
 TIMEOUT = 90             # max recording per answer in seconds
+
+# sessions
+SESSION_TTL = 30 * 60    # drop sessions idle for 30 minutes
+MAX_SESSIONS = 200       # LRU cap on live sessions held in memory
+SESSION_STORE = "memory"  # "memory" (one process) | "sqlite" (workers on one host) | "file" (shared-KV stand-in)
+SESSION_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sessions", "sessions.db")
+SESSION_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sessions", "kv")
+
+# llm batching
+LLM_MAX_BATCH = 4        # max concurrent ask_llm calls folded into one generate()
+LLM_BATCH_WAIT_MS = 20   # how long the scheduler waits to fill a batch
+
+# streamed speech
+TTS_PIPELINE_WORKERS = 2       # sentences synthesized in parallel while the LLM generates
+TTS_MIN_SENTENCE_CHARS = 24    # short fragments are merged before being sent to TTS
+
+# tts cache
+TTS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tts_cache")  # None disables the disk tier
+TTS_CACHE_MEM_MB = 64      # in-process LRU of synthesized MP3s
+TTS_CACHE_DISK_MB = 512    # on-disk tier, survives restarts
+
+# question bank
+QUESTION_BANK_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions", "bank.jsonl")
+QUESTION_BANK_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".question_bank")
+QUESTION_TAG = None              # only ask questions with this tag (None: any)
+QUESTION_MAX_DIFFICULTY = None   # only ask questions at or below this difficulty (None: any)
+
+# question rewrite cache
+QUESTION_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".question_cache")
+QUESTION_CACHE_MB = 256                  # rewritten questions + their audio on disk, least recently used evicted
+PRECOMPUTE_QUESTIONS_ON_STARTUP = True   # fill missing bank rewrites in the background at boot
+PRECOMPUTE_QUESTIONS_PER_ROLE = 200      # large banks: only the first N of each role are precomputed
+
+# audio transport
+AUDIO_TRANSPORT = "url"    # "url": reply carries ai_audio_url for GET /api/audio/{id}; "hex": inline ai_audio_b64
+                           # (clips are per process, so "url" falls back to "hex" unless SESSION_STORE is "memory")
+AUDIO_STORE_MB = 128       # clips kept for /api/audio
+AUDIO_STORE_TTL = 10 * 60  # seconds a clip stays fetchable
+AUDIO_CHUNK_BYTES = 64 * 1024
+
+# worker pools (one per model stage) and backpressure
+STT_WORKERS = 1            # Whisper decodes run one at a time on its own pool
+STT_MAX_QUEUE = 8          # uploads allowed to wait for STT before answering 503
+LLM_WORKERS = 8            # agent turns in flight; their ask_llm calls share scheduler batches
+LLM_MAX_QUEUE = 16         # turns allowed to wait for a worker before answering 503
+TTS_MAX_CONCURRENCY = 4    # edge-tts syntheses running at once across all turns
+EDGE_TTS_TIMEOUT = 30       # seconds before an edge-tts synthesis is abandoned
+
+# voice activity trimming before Whisper
+VAD_ENABLED = True
+VAD_FRAME_MS = 30
+VAD_THRESHOLD = 0.01       # min frame RMS counted as speech (same scale as the CLI silence threshold)
+VAD_NOISE_RATIO = 3.0      # ...or this multiple of the clip's noise floor, whichever is higher
+VAD_PAD_MS = 300           # silence kept on each side of speech
+VAD_MAX_PAUSE = 1.0        # internal pauses longer than this many seconds are cut down to it
+
+# streaming transcription
+STREAM_STT_MIN_SEGMENT = 3.0    # seconds buffered before a pause may close a segment
+STREAM_STT_PAUSE = 0.6          # trailing silence (s) that marks a segment boundary
+STREAM_STT_MAX_SEGMENT = 20.0   # force a cut at the quietest frame past this length
+
+# speculative next question
+PREFETCH_NEXT_QUESTION = True   # prepare the next main question while the candidate answers
+PREFETCH_WORKERS = 2
+
+# final feedback
+FEEDBACK_USER_TYPE = "heuristic"   # "heuristic": word-count rules, free; "llm": short classification run alongside the feedback
+
+# multi-worker deployment (gunicorn_conf.py): weights loaded once in the master, shared copy-on-write
+WEB_WORKERS = 2                  # HTTP worker processes
+TORCH_THREADS_PER_WORKER = None  # None: CPU cores / WEB_WORKERS
+
+# llm precision (CPU)
+LLM_PRECISION = "auto"   # "auto" | "fp32" | "bf16" | "int8" | "prequantized"
+LLM_PREQUANTIZED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".models", "qwen-int8.pt")
+
+# speculative decoding: a small draft model proposes tokens, MODEL_NAME verifies them (greedy output unchanged)
+LLM_DRAFT_MODEL = None     # e.g. "Qwen/Qwen2.5-0.5B-Instruct"; must share MODEL_NAME's tokenizer
+LLM_DRAFT_TOKENS = 5       # tokens proposed per step (transformers adapts it as drafts are accepted/rejected)
+
+# model backends ("fake": deterministic stand-ins with the latencies below, for benchmarks)
+LLM_BACKEND = "hf"         # "hf" | "fake"
+STT_BACKEND = "whisper"    # "whisper" | "fake"
+TTS_BACKEND = "edge"       # "edge" (network) | "espeak" (local espeak-ng + ffmpeg) | "fake"
+FAKE_LLM_PREFILL_MS = 150  # per generate() batch
+FAKE_LLM_TOKEN_MS = 25     # per decode step (shared by every row of a batch)
+FAKE_STT_BASE_MS = 100
+FAKE_STT_RTF = 0.1         # seconds of decoding per second of audio
+FAKE_STT_TEXT = "I am a software engineer and I would solve it step by step using a hash map and a queue"
+FAKE_TTS_BASE_MS = 150
+FAKE_TTS_CHAR_MS = 2
+
+# local tts (TTS_BACKEND = "espeak")
+LOCAL_TTS_VOICE = "en-us"     # espeak-ng voice
+LOCAL_TTS_RATE = 165          # words per minute
+LOCAL_TTS_BITRATE = "48k"     # MP3 bitrate from ffmpeg
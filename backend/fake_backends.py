@@ -0,0 +1,80 @@
+# backend/fake_backends.py
+# Deterministic stand-ins for Qwen, Whisper and edge-tts, selected with
+# LLM_BACKEND / STT_BACKEND / TTS_BACKEND = "fake". They sleep for a
+# configurable latency and return stable output, so full interviews can be
+# benchmarked without models, network or a microphone.
+import time
+import random
+import hashlib
+import config
+
+_WORDS = (
+    "latency cache index query queue thread memory request model batch "
+    "metric customer design trade-off complexity example test failure rollback"
+).split()
+
+
+def _rng(*parts) -> random.Random:
+    seed = hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8")).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def _sleep_ms(ms: float):
+    if ms > 0:
+        time.sleep(ms / 1000.0)
+
+
+# ===================== LLM =====================
+def fake_reply(prompt: str, max_new_tokens: int) -> str:
+    """One word per token. Short limits get a question, long ones a feedback paragraph."""
+    rng = _rng(prompt, max_new_tokens)
+    if max_new_tokens <= 64:
+        n = min(max_new_tokens, rng.randint(8, 16))
+        return "How would you handle the " + " ".join(rng.choice(_WORDS) for _ in range(n - 5)) + "?"
+    sentences, n = [], 0
+    while n < min(max_new_tokens, 120):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 12))]
+        sentences.append(" ".join(words).capitalize() + ".")
+        n += len(words)
+    return " ".join(sentences)
+
+
+def fake_generate_batch(requests):
+    """
+    Mirror of hf_generate.generate_batch: one prefill per batch, then one step
+    per token for all rows, each streamed row getting its own words and each
+    request resolved as soon as its row ends. Fake questions already end at
+    their '?'.
+    """
+    texts = [fake_reply(r.prompt, r.max_new_tokens) for r in requests]
+    words = [t.split(" ") for t in texts]
+    _sleep_ms(config.FAKE_LLM_PREFILL_MS)
+    for i in range(max(len(w) for w in words)):
+        _sleep_ms(config.FAKE_LLM_TOKEN_MS)
+        for r, w, text in zip(requests, words, texts):
+            if i >= len(w) or r.future.done():
+                continue
+            if r.cancel is not None and r.cancel.is_set():
+                r.future.set_result(" ".join(w[:i]))
+                continue
+            if r.on_token is not None:
+                r.on_token(("" if i == 0 else " ") + w[i])
+            if i == len(w) - 1:
+                r.future.set_result(text)
+
+
+# ===================== STT =====================
+def fake_transcribe(audio, prompt=None, sr: int = config.SAMPLE_RATE) -> str:
+    seconds = len(audio) / sr
+    _sleep_ms(config.FAKE_STT_BASE_MS + 1000 * config.FAKE_STT_RTF * seconds)
+    words = config.FAKE_STT_TEXT.split()
+    n = max(1, int(seconds * 2.5))   # ~150 words per minute
+    return " ".join(words[i % len(words)] for i in range(n))
+
+
+# ===================== TTS =====================
+def fake_synthesize(text: str, voice: str) -> bytes:
+    _sleep_ms(config.FAKE_TTS_BASE_MS + config.FAKE_TTS_CHAR_MS * len(text))
+    # an ID3 header and roughly 1 kB per 16 characters, like a 24 kbps MP3
+    body = hashlib.sha256(f"{voice}\x1f{text}".encode("utf-8")).digest()
+    return b"ID3" + body * max(1, len(text) * 2)
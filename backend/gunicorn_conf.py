@@ -0,0 +1,36 @@
+# backend/gunicorn_conf.py
+# Several HTTP workers sharing one copy of the model weights.
+#   cd backend && gunicorn -c gunicorn_conf.py main:app
+# The master imports the app and loads Qwen/Whisper before forking; workers
+# inherit those pages copy-on-write, so N workers cost about one model's RAM
+# (compare pss_mb across workers on /api/ready). The master also synthesizes
+# the static TTS phrases, once. Question rewrites are not made there (torch
+# runs single-threaded in the master): one worker fills the question cache in
+# the background after fork, or precompute_questions.py does it ahead of time.
+# Any worker may serve any turn, so SESSION_STORE must be "sqlite" or "file".
+import os
+from config import WEB_WORKERS, TORCH_THREADS_PER_WORKER, SESSION_STORE
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = WEB_WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True   # import main (and its engines) once, in the master
+timeout = 300        # a cold feedback generation can take a while on CPU
+
+
+def on_starting(server):
+    if SESSION_STORE == "memory" and server.cfg.workers > 1:
+        raise RuntimeError(
+            f"SESSION_STORE = 'memory' keeps sessions inside one process, but {server.cfg.workers} "
+            "workers are configured: set SESSION_STORE to 'sqlite' or 'file' (or WEB_WORKERS = 1)"
+        )
+    import main
+    import model_runtime
+    model_runtime.load_before_fork(prepare=main.warm_tts_phrases)
+
+
+def post_fork(server, worker):
+    import torch
+    threads = TORCH_THREADS_PER_WORKER or max(1, (os.cpu_count() or 1) // WEB_WORKERS)
+    torch.set_num_threads(threads)
+    server.log.info(f"worker {worker.pid}: torch threads = {threads}")
@@ -0,0 +1,260 @@
+# backend/hf_generate.py
+# Batched greedy decoding with Hugging Face transformers for llm_engine's
+# scheduler. Imported on first use, so torch and transformers are only
+# loaded by processes that actually run the model.
+import re
+import copy
+import time
+import threading
+import torch
+from transformers import DynamicCache, StoppingCriteria, StoppingCriteriaList
+from transformers.generation.streamers import BaseStreamer
+from model_runtime import get_llm, get_draft
+from metrics import LLM_PREFILL_SECONDS, LLM_TOKENS, LLM_TOKENS_PER_SECOND
+
+# ===================== PREFIX KV CACHE =====================
+class _PrefixEntry:
+    __slots__ = ("ids", "cache")
+
+    def __init__(self, ids, cache):
+        self.ids = ids        # list of token ids
+        self.cache = cache    # DynamicCache holding the prefix's keys/values
+
+
+_prefix_lock = threading.Lock()
+_prefixes = {}   # full prefix text -> _PrefixEntry
+_prefix_stats = {"hits": 0, "misses": 0, "tokens_reused": 0}
+
+
+def build_prefix(text: str):
+    """Encode `text` once and keep its past_key_values for prompts that start with it."""
+    with _prefix_lock:
+        if text in _prefixes:
+            return
+    tokenizer, model, _ = get_llm()
+    ids = tokenizer(text)["input_ids"]
+    cache = DynamicCache()
+    with torch.no_grad():
+        model(input_ids=torch.tensor([ids]), past_key_values=cache, use_cache=True)
+    with _prefix_lock:
+        _prefixes[text] = _PrefixEntry(ids, cache)
+    print(f"Cached prompt prefix ({len(ids)} tokens).")
+
+
+def prefix_cache_stats() -> dict:
+    with _prefix_lock:
+        return dict(_prefix_stats, prefixes=len(_prefixes))
+
+
+def _shared_prefix(rows):
+    # longest registered prefix that every row strictly extends, compared on
+    # token ids so a cached run sees exactly the same input as an uncached one
+    best = None
+    with _prefix_lock:
+        entries = list(_prefixes.values())
+    for entry in entries:
+        n = len(entry.ids)
+        if best is not None and n <= len(best.ids):
+            continue
+        if all(len(r) > n and r[:n] == entry.ids for r in rows):
+            best = entry
+    return best
+
+
+def _prefixed_inputs(entry, rows):
+    # [prefix][pad...][suffix]: the prefix stays aligned with its cached
+    # positions and the attention mask hides the padding in the middle
+    n = len(entry.ids)
+    suffixes = [r[n:] for r in rows]
+    width = max(len(sfx) for sfx in suffixes)
+    pad = get_llm()[0].pad_token_id
+    input_ids = [entry.ids + [pad] * (width - len(sfx)) + sfx for sfx in suffixes]
+    mask = [[1] * n + [0] * (width - len(sfx)) + [1] * len(sfx) for sfx in suffixes]
+    cache = copy.deepcopy(entry.cache)
+    if len(rows) > 1:
+        cache.batch_repeat_interleave(len(rows))
+    return {
+        "input_ids": torch.tensor(input_ids),
+        "attention_mask": torch.tensor(mask),
+        "past_key_values": cache,
+    }
+
+
+def _model_inputs(prompts):
+    tokenizer = get_llm()[0]
+    rows = [tokenizer(p)["input_ids"] for p in prompts]
+    entry = _shared_prefix(rows)
+    if entry is not None:
+        with _prefix_lock:
+            _prefix_stats["hits"] += len(rows)
+            _prefix_stats["tokens_reused"] += len(entry.ids) * len(rows)
+        return _prefixed_inputs(entry, rows)
+    with _prefix_lock:
+        _prefix_stats["misses"] += len(rows)
+    return tokenizer(prompts, return_tensors="pt", padding=True)
+
+
+# ===================== BATCHED DECODING =====================
+# same shape llm_engine._extract_first_question looks for: a '?' closing 5+ characters on one line
+_QUESTION_END = re.compile(r'[^\?\r\n]{5,}\?')
+
+
+def _stop_ids(tokenizer, model) -> set:
+    eos = model.generation_config.eos_token_id
+    ids = set(eos if isinstance(eos, (list, tuple)) else [eos])
+    ids.update((tokenizer.eos_token_id, tokenizer.pad_token_id))
+    ids.discard(None)
+    return ids
+
+
+class _RowText:
+    """
+    Incremental detokenizer for one batch row. Text goes to the request's
+    `on_token` as soon as it is stable (up to the last space or line break,
+    never half a UTF-8 character). When the row ends (EOS or its own
+    max_new_tokens, the end of its first question in question mode, or its
+    caller setting the request's cancel Event) the
+    rest is flushed and the request's Future resolved at once, while longer
+    rows of the batch keep decoding.
+    """
+
+    def __init__(self, tokenizer, request, stop_ids):
+        self.tokenizer = tokenizer
+        self.request = request
+        self.on_token = request.on_token
+        self.stop_ids = stop_ids
+        self.ids = []
+        self.ended = False
+        self._sent = 0
+
+    def add(self, ids):
+        if self.ended:
+            return
+        for t in ids:
+            if t in self.stop_ids:      # EOS, or padding after the row finished
+                self.ended = True
+                break
+            self.ids.append(t)
+            if len(self.ids) >= self.request.max_new_tokens:
+                self.ended = True
+                break
+        text = self.text()
+        if self.request.stop_at_question and _QUESTION_END.search(text):
+            self.ended = True
+        if self.request.cancel is not None and self.request.cancel.is_set():
+            self.ended = True
+        self._emit(text, final=self.ended)
+        if self.ended:
+            self._resolve()
+
+    def close(self):
+        self.ended = True
+        self._emit(self.text(), final=True)
+        self._resolve()
+
+    def _resolve(self):
+        if not self.request.future.done():
+            self.request.future.set_result(self.text().strip())
+
+    def text(self) -> str:
+        return self.tokenizer.decode(self.ids, skip_special_tokens=True)
+
+    def _emit(self, text: str, final: bool):
+        if self.on_token is None:
+            return
+        if not final:
+            if text.endswith("\ufffd"):
+                return
+            if not text.endswith("\n"):
+                text = text[:text.rfind(" ") + 1]
+        if len(text) <= self._sent:
+            return
+        piece, self._sent = text[self._sent:], len(text)
+        try:
+            self.on_token(piece)
+        except Exception as e:
+            print("LLM on_token error:", e)
+            self.on_token = None
+
+
+class _RowStreams(BaseStreamer):
+    """
+    Streamer for a whole batch: splits every generate() step by row, so each
+    request gets its own text stream and streamed requests can share a batch
+    with plain ones. Also notes when the first new token arrives (end of prefill).
+    """
+
+    def __init__(self, tokenizer, model, requests):
+        stop_ids = _stop_ids(tokenizer, model)
+        self.rows = [_RowText(tokenizer, r, stop_ids) for r in requests]
+        self.first_token_at = None
+        self._prompt_seen = False
+
+    def put(self, value):
+        if not self._prompt_seen:   # the first put is the prompt itself
+            self._prompt_seen = True
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        if value.dim() == 1:        # one token per row; assisted decoding sends several
+            value = value[:, None]
+        for row, ids in zip(self.rows, value.tolist()):
+            row.add(ids)
+
+    def end(self):
+        for row in self.rows:
+            row.close()
+
+
+class _RowsDone(StoppingCriteria):
+    """Marks rows that _RowStreams has finished, so generate() pads them and ends once all are."""
+
+    def __init__(self, streams):
+        self.streams = streams
+
+    def __call__(self, input_ids, scores, **kwargs):
+        done = [row.ended for row in self.streams.rows]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+def generate_batch(requests):
+    """
+    Greedy-decode several requests in one padded generate() call, resolving
+    each request's Future as soon as its row ends: a short question batched
+    with a long feedback returns after its own max_new_tokens, not the
+    feedback's. Greedy rows give the same text as a solo run.
+    Rows with an on_token callback receive their text as it is produced.
+    With LLM_DRAFT_MODEL set, a lone prompt is decoded speculatively
+    (transformers assisted generation only supports batch size 1).
+    Question-mode rows end (and return) at the end of their first question.
+    """
+    tokenizer, model, _ = get_llm()
+    prompts = [r.prompt for r in requests]
+    draft = get_draft() if len(prompts) == 1 else None
+    if draft is not None:
+        # the draft keeps its own cache in step with the main model's, so the
+        # shared prefix cache is not used here
+        inputs = tokenizer(prompts, return_tensors="pt")
+    else:
+        inputs = _model_inputs(prompts)
+    streams = _RowStreams(tokenizer, model, requests)
+    stopping = StoppingCriteriaList([_RowsDone(streams)])
+    start = time.perf_counter()
+    with torch.no_grad():
+        model.generate(
+            **inputs,
+            max_new_tokens=max(r.max_new_tokens for r in requests),
+            do_sample=False,
+            pad_token_id=tokenizer.pad_token_id,
+            streamer=streams,
+            assistant_model=draft,
+            stopping_criteria=stopping
+        )
+    elapsed = time.perf_counter() - start
+
+    counts = [len(row.ids) for row in streams.rows]
+    if streams.first_token_at is not None:
+        LLM_PREFILL_SECONDS.observe(streams.first_token_at - start)
+    for n in counts:
+        LLM_TOKENS.observe(n)
+    if elapsed > 0:
+        LLM_TOKENS_PER_SECOND.observe(sum(counts) / elapsed)
@@ -0,0 +1,61 @@
+# backend/llm_backends.py
+# Text generators behind llm_engine's scheduler, chosen by config.LLM_BACKEND.
+# Each one decodes a batch of requests (prompt, max_new_tokens, on_token,
+# stop_at_question, cancel) and resolves every request's future as its row
+# ends; queueing and batching stay in llm_engine.
+from model_runtime import require, on_llm_loaded, llm_loaded
+from fake_backends import fake_generate_batch
+
+
+class LLMBackend:
+    name = ""
+
+    def generate_batch(self, requests):
+        raise NotImplementedError
+
+    def register_prefix(self, text: str):
+        """A prompt head many requests start with; backends without a KV cache ignore it."""
+
+    def prefix_stats(self) -> dict:
+        return {"hits": 0, "misses": 0, "tokens_reused": 0, "prefixes": 0}
+
+
+def _hf():
+    import hf_generate   # pulls in torch/transformers; only the real model needs them
+    return hf_generate
+
+
+# ===================== HUGGING FACE (Qwen) =====================
+class HFBackend(LLMBackend):
+    """MODEL_NAME through transformers, loaded by model_runtime; decoding lives in hf_generate."""
+    name = "hf"
+
+    def __init__(self):
+        require("llm")
+
+    def generate_batch(self, requests):
+        _hf().generate_batch(requests)
+
+    def register_prefix(self, text: str):
+        # built right after the model loads, so registering at import costs nothing
+        on_llm_loaded(lambda: _hf().build_prefix(text))
+
+    def prefix_stats(self) -> dict:
+        return _hf().prefix_cache_stats() if llm_loaded() else super().prefix_stats()
+
+
+# ===================== FAKE (benchmarks) =====================
+class FakeLLMBackend(LLMBackend):
+    name = "fake"
+
+    def generate_batch(self, requests):
+        fake_generate_batch(requests)
+
+
+BACKENDS = {b.name: b for b in (HFBackend, FakeLLMBackend)}
+
+
+def make_backend(name: str) -> LLMBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
@@ -1,14 +1,14 @@
 # backend/llm_engine.py
-import torch
+import os
 import re
-from transformers import AutoTokenizer, AutoModelForCausalLM
-from config import MODEL_NAME
-
-print("Loading Qwen (backend)...")
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForCausalLM.from_pretrained(MODEL_NAME, torch_dtype=torch.float32)
-model.eval()
-print("Qwen ready (backend).")
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Iterator, Optional
+from config import LLM_MAX_BATCH, LLM_BATCH_WAIT_MS, LLM_BACKEND
+from metrics import span
+from llm_backends import make_backend
 
 # Strong system persona for interviewer
 SYSTEM_PROMPT = (
@@ -29,35 +29,209 @@ def _clean_output(s: str) -> str:
     return s
 
 def _extract_first_question(text: str) -> str:
-    # Find the first sentence that contains a '?'
-    # fallback: if no '?', turn the first short sentence into a question
-    lines = [ln.strip() for ln in re.split(r'[\r\n]+', text) if ln.strip()]
-    for ln in lines:
-        if '?' in ln:
-            # return shortest question-like substring
-            m = re.search(r'([^\?]{5,250}\?)', ln)
-            if m:
-                return m.group(1).strip()
-            return ln
-    # no question found — try to craft a single short question from text
-    first = lines[0] if lines else text
-    first = re.sub(r'\.$', '?', first)
-    if not first.endswith('?'):
-        first = first.rstrip('.') + '?'
-    return first
-
-def ask_llm(prompt: str, max_new_tokens: int = 128, require_question: bool = False) -> str:
-    full_prompt = SYSTEM_PROMPT + "\n\n" + prompt
-    inputs = tokenizer(full_prompt, return_tensors="pt")
-    ilen = inputs["input_ids"].shape[1]
-    with torch.no_grad():
-        out = model.generate(
-            **inputs,
-            max_new_tokens=max_new_tokens,
-            do_sample=False,
-            pad_token_id=tokenizer.eos_token_id
-        )
-    raw = tokenizer.decode(out[0][ilen:], skip_special_tokens=True).strip()
+    # The first question-like sentence (5-250 characters ending in '?'), or ""
+    # when the model produced none, so callers fall back to a known question
+    for ln in re.split(r'[\r\n]+', text):
+        m = re.search(r'([^\?]{5,250}\?)', ln)
+        if m:
+            return m.group(1).strip()
+    return ""
+
+
+# ===================== PREFIX KV CACHE =====================
+backend = make_backend(LLM_BACKEND)
+_prefix_lock = threading.Lock()
+_registered_prefixes = set()
+
+
+def register_prefix(prompt_prefix: str = ""):
+    """
+    Precompute past_key_values for SYSTEM_PROMPT + prompt_prefix, a constant
+    head shared by many ask_llm prompts. Later generations whose token ids
+    start with it skip re-encoding those tokens. Built once the model is
+    loaded, so registering at import time costs nothing.
+    """
+    text = SYSTEM_PROMPT + "\n\n" + prompt_prefix
+    with _prefix_lock:
+        if text in _registered_prefixes:
+            return
+        _registered_prefixes.add(text)
+    backend.register_prefix(text)
+
+
+def prefix_cache_stats() -> dict:
+    return backend.prefix_stats()
+
+
+class _GenRequest:
+    __slots__ = ("prompt", "max_new_tokens", "on_token", "stop_at_question", "cancel", "future", "enqueued_at")
+
+    def __init__(self, prompt: str, max_new_tokens: int, on_token=None, stop_at_question: bool = False,
+                 cancel: Optional[threading.Event] = None):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.on_token = on_token
+        self.stop_at_question = stop_at_question
+        self.cancel = cancel
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class GenerationScheduler:
+    """
+    Background thread that owns the model. Callers from any session submit a
+    prompt and get a Future; pending requests that arrive within `wait_ms` of
+    each other are decoded together as one padded batch, streamed or not.
+    """
+
+    def __init__(self, generate, max_batch: int = LLM_MAX_BATCH, wait_ms: float = LLM_BATCH_WAIT_MS):
+        self._generate = generate    # backend.generate_batch: decodes a batch, resolves each future
+        self.max_batch = max(1, max_batch)
+        self.wait_s = wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._batch_sizes = {}       # batch size -> count
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._last_batch_size = 0
+
+    def submit(self, prompt: str, max_new_tokens: int, on_token: Optional[Callable[[str], None]] = None,
+               stop_at_question: bool = False, cancel: Optional[threading.Event] = None) -> Future:
+        """
+        Queue a prompt; `on_token` (called on the scheduler thread) receives its
+        text as it is generated. Setting `cancel` ends the row at its next step
+        (or skips it if it has not started); the Future then holds the partial text.
+        """
+        self._ensure_started()
+        req = _GenRequest(prompt, max_new_tokens, on_token, stop_at_question, cancel)
+        self._queue.put(req)
+        return req.future
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "requests": self._requests,
+                "last_batch_size": self._last_batch_size,
+                "mean_batch_size": (self._requests / self._batches) if self._batches else 0.0,
+                "batch_size_counts": dict(sorted(self._batch_sizes.items())),
+                "mean_queue_wait_ms": (1000.0 * self._queue_wait_total / self._requests) if self._requests else 0.0,
+                "max_queue_wait_ms": 1000.0 * self._queue_wait_max,
+            }
+
+    def _after_fork(self):
+        # the scheduler thread (started by warm-up work in gunicorn's master)
+        # does not exist in a forked child: start over with fresh state
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="llm-scheduler", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.wait_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        # drop callers that gave up while waiting
+        ready = []
+        for r in batch:
+            if not r.future.set_running_or_notify_cancel():
+                continue
+            if r.cancel is not None and r.cancel.is_set():
+                r.future.set_result("")
+                continue
+            ready.append(r)
+        return ready
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+            self._record(batch)
+            try:
+                self._generate(batch)   # resolves each row's future as it finishes
+            except Exception as e:
+                print("LLM batch error:", e)
+                for r in batch:
+                    if not r.future.done():
+                        r.future.set_exception(e)
+
+    def _record(self, batch):
+        now = time.monotonic()
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._last_batch_size = len(batch)
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            for r in batch:
+                waited = now - r.enqueued_at
+                self._queue_wait_total += waited
+                self._queue_wait_max = max(self._queue_wait_max, waited)
+
+
+scheduler = GenerationScheduler(backend.generate_batch)
+os.register_at_fork(after_in_child=scheduler._after_fork)
+register_prefix()
+
+
+def _framed(prompt: str, system_prompt: Optional[str]) -> str:
+    return system_prompt + "\n\n" + prompt if system_prompt else prompt
+
+
+def stream_llm(prompt: str, max_new_tokens: int = 128,
+               system_prompt: Optional[str] = SYSTEM_PROMPT, stop_at_question: bool = False) -> Iterator[str]:
+    """
+    Yield raw text pieces as the model produces them. Same prompt framing,
+    greedy decoding and batching as ask_llm.
+    """
+    pieces = queue.Queue()
+    fut = scheduler.submit(_framed(prompt, system_prompt), max_new_tokens,
+                           on_token=pieces.put, stop_at_question=stop_at_question)
+    fut.add_done_callback(lambda _: pieces.put(None))
+    while True:
+        piece = pieces.get()
+        if piece is None:
+            break
+        yield piece
+    fut.result()   # re-raise a generation error after the stream closes
+
+
+def ask_llm(prompt: str, max_new_tokens: int = 128, require_question: bool = False,
+            on_token: Optional[Callable[[str], None]] = None,
+            system_prompt: Optional[str] = SYSTEM_PROMPT,
+            cancel: Optional[threading.Event] = None) -> str:
+    """
+    Generate a reply for `prompt`. With `on_token`, the raw text is also
+    pushed to the callback piece by piece while it is being generated.
+    `system_prompt=None` sends the prompt as is (it carries its own persona).
+    With `require_question`, decoding stops once one question is complete and
+    the result is reduced to that question (max_new_tokens is only a cap).
+    Setting `cancel` stops the generation early (the caller discards the text).
+    """
+    with span("llm"):
+        full_prompt = _framed(prompt, system_prompt)
+        raw = scheduler.submit(full_prompt, max_new_tokens, on_token=on_token,
+                               stop_at_question=require_question, cancel=cancel).result()
     cleaned = _clean_output(raw)
     if require_question:
         q = _extract_first_question(cleaned)
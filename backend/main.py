@@ -1,58 +1,368 @@
 # backend/main.py
 import os
-import tempfile
-from fastapi import FastAPI, File, UploadFile
+import re
+import json
+import asyncio
+import threading
+from typing import Optional
+import numpy as np
+from fastapi import FastAPI, File, Form, Header, HTTPException, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from agent import InterviewAgent
-from stt_engine import transcribe_file
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sessions import SessionRegistry
+from session_store import VersionConflict
+from audio_store import AudioStore
+from workers import StagePool, Saturated
+from agent import STATIC_PHRASES, precompute_question_cache
+from config import PRECOMPUTE_QUESTIONS_ON_STARTUP, QUESTION_CACHE_DIR, AUDIO_TRANSPORT, AUDIO_CHUNK_BYTES, SESSION_STORE
+from config import TIMEOUT, SAMPLE_RATE, STT_WORKERS, STT_MAX_QUEUE, LLM_WORKERS, LLM_MAX_QUEUE
+from tts_engine import tts_cache, warm_tts_cache
+from llm_engine import scheduler, prefix_cache_stats
+from stt_engine import transcribe_bytes, transcribe_array
+from stream_stt import StreamingTranscriber
+from vad import vad_stats
+import model_runtime
+import metrics
+from metrics import span
 
 app = FastAPI()
-agent = InterviewAgent()
+sessions = SessionRegistry()
+audio_store = AudioStore()
+
+# Blocking model work never runs on the event loop. Whisper and the agent
+# turns (LLM + TTS) get separate pools so one can't starve the other.
+stt_pool = StagePool("stt", STT_WORKERS, STT_MAX_QUEUE)
+llm_pool = StagePool("llm", LLM_WORKERS, LLM_MAX_QUEUE)
+
+metrics.register_stats("interview_llm", "LLM scheduler / prefix cache stats (see /api/llm_stats)", lambda: llm_stats())
+metrics.register_stats("interview_pool", "Stage pool occupancy (see /api/pool_stats)", lambda: pool_stats())
+metrics.register_stats("interview_tts_cache", "TTS cache stats (see /api/tts_stats)", lambda: tts_stats())
+metrics.register_stats("interview_vad", "VAD trimming totals (see /api/stt_stats)", vad_stats)
+metrics.register_stats("interview_sessions", "Live sessions", lambda: {"live": len(sessions)})
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]
 )
 
+@app.exception_handler(Saturated)
+async def saturated_handler(request, exc: Saturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Server busy ({exc.stage}), please retry"},
+        headers={"Retry-After": "2"}
+    )
+
+@app.exception_handler(VersionConflict)
+async def conflict_handler(request, exc: VersionConflict):
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "Session was updated by another request, please retry"}
+    )
+
+def warm_tts_phrases():
+    """Synthesize the static phrases (gunicorn's master does this once before forking)."""
+    warm_tts_cache(STATIC_PHRASES)
+
+def _precompute_once():
+    # every gunicorn worker runs startup: only the one holding the lock precomputes
+    import fcntl
+    os.makedirs(QUESTION_CACHE_DIR, exist_ok=True)
+    with open(os.path.join(QUESTION_CACHE_DIR, ".precompute.lock"), "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+        precompute_question_cache()
+
+@app.on_event("startup")
+def warm_up():
+    if PRECOMPUTE_QUESTIONS_ON_STARTUP:
+        # disk-cached, so cheap after the first run; runs while requests are served
+        threading.Thread(target=_precompute_once, daemon=True).start()
+    if model_runtime.preloaded():
+        return   # gunicorn's master loaded the models and the TTS phrases before forking
+    # the port is bound right away; models load in the background (see /api/ready)
+    model_runtime.warm_up()
+    threading.Thread(target=warm_tts_phrases, daemon=True).start()
+
+def _start_session() -> dict:
+    sess = sessions.create()
+    with sess.lock:
+        res = sess.agent.start()
+        sessions.save(sess)
+    res["session_id"] = sess.session_id
+    return res
+
 @app.post("/api/start")
-def start():
-    return agent.start()
+async def start(transport: str = AUDIO_TRANSPORT):
+    res = await llm_pool.submit(_start_session)
+    return _encode_audio(res, transport)
 
-@app.post("/api/send_audio")
-async def send_audio(audio: UploadFile = File(...)):
-    print("\n\n==============================")
-    print("=== /api/send_audio CALLED ===")
-    print("==============================")
+@app.get("/api/ready")
+def ready():
+    """200 once Whisper and Qwen are loaded, 503 while they are still warming up."""
+    status = model_runtime.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
 
-    suffix = os.path.splitext(audio.filename)[1] or ".webm"
-    tmp_path = tempfile.mktemp(suffix=suffix)
-    data = await audio.read()
-    with open(tmp_path, "wb") as f:
-        f.write(data)
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-    print(f"Saved incoming audio -> {tmp_path}")
-    print("File size:", len(data), "bytes")
+@app.post("/api/end")
+def end(session_id: str = Form(...)):
+    return {"ended": sessions.remove(session_id)}
 
-    # transcribe
-    text = transcribe_file(tmp_path)
+@app.get("/api/llm_stats")
+def llm_stats():
+    stats = scheduler.stats()
+    stats["prefix_cache"] = prefix_cache_stats()
+    stats["precision"] = model_runtime.llm_precision()
+    return stats
 
-    try:
-        os.remove(tmp_path)
-    except:
-        pass
+@app.get("/api/stt_stats")
+def stt_stats():
+    return {"vad": vad_stats()}
+
+@app.get("/api/pool_stats")
+def pool_stats():
+    return {"stt": stt_pool.stats(), "llm": llm_pool.stats()}
+
+@app.get("/api/tts_stats")
+def tts_stats():
+    return tts_cache.stats()
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+@app.get("/api/audio/{audio_id}")
+def get_audio(audio_id: str, range_header: Optional[str] = Header(None, alias="Range")):
+    """Raw MP3 for an `ai_audio_url`, with single-range support for seeking/streaming players."""
+    data = audio_store.get(audio_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired audio")
+
+    size = len(data)
+    start, end, status = 0, size - 1, 200
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": "private, max-age=600"}
+    if range_header:
+        m = _RANGE.match(range_header.strip())
+        if not m or not (m.group(1) or m.group(2)):
+            raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        if m.group(1):
+            start = int(m.group(1))
+            end = min(int(m.group(2)) if m.group(2) else size - 1, size - 1)
+        else:
+            # suffix range: the last N bytes
+            start = max(0, size - int(m.group(2)))
+        if start > end:
+            raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        _iter_slices(data, start, end + 1),
+        status_code=status,
+        media_type="audio/mpeg",
+        headers=headers
+    )
+
+def _iter_slices(data: bytes, start: int, stop: int):
+    # slice through a memoryview so only one chunk is copied at a time
+    view = memoryview(data)
+    for i in range(start, stop, AUDIO_CHUNK_BYTES):
+        yield bytes(view[i:min(i + AUDIO_CHUNK_BYTES, stop)])
+
+# audio ids live in this process's AudioStore; once sessions are shared between
+# workers the client's GET may reach another one, so audio is then sent inline
+_AUDIO_URLS = SESSION_STORE == "memory"
+
+def _audio_ref(mp3: bytes, transport: str) -> dict:
+    if transport == "hex" or not _AUDIO_URLS:
+        return {"ai_audio_b64": mp3.hex()}
+    return {"ai_audio_url": f"/api/audio/{audio_store.put(mp3)}" if mp3 else ""}
+
+def _encode_audio(res: dict, transport: str) -> dict:
+    """Swap the agent's raw `ai_audio` bytes for the transport the client asked for."""
+    with span("serialize"):
+        mp3 = res.pop("ai_audio", b"") or b""
+        res.update(_audio_ref(mp3, transport))
+    return res
+
+def _get_session(session_id: str):
+    # store I/O and snapshot decoding: call it off the event loop
+    sess = sessions.get(session_id)
+    if sess is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return sess
 
+async def _transcribe_upload(audio: UploadFile) -> str:
+    with span("upload"):
+        data = await audio.read()
+    print(f"Received audio '{audio.filename}':", len(data), "bytes")
+
+    # decoded in memory; no temp file round trip
+    return await stt_pool.submit(transcribe_bytes, data)
+
+def _run_turn(sess, text: str, on_token=None, on_audio=None) -> dict:
     # pass to agent
-    try:
-        result = agent.process_audio_text(text)
-    except Exception as e:
-        print("Agent processing error:", e)
-        # reset agent and restart flow
-        result = agent.start()
+    with sess.lock, span("turn"):
+        try:
+            result = sess.agent.process_audio_text(text, on_token=on_token, on_audio=on_audio)
+        except Exception as e:
+            print("Agent processing error:", e)
+            # reset agent and restart flow
+            result = sess.agent.start()
+        # persisted before replying, so the next turn may land on any worker
+        sessions.save(sess)
 
     # return user_text + agent reply
-    res = {"user_text": text}
+    res = {"user_text": text, "session_id": sess.session_id}
     if isinstance(result, dict):
         res.update(result)
     else:
         res["ai_text"] = str(result)
     return res
+
+@app.post("/api/send_audio")
+async def send_audio(audio: UploadFile = File(...), session_id: str = Form(...),
+                     transport: str = AUDIO_TRANSPORT):
+    print("\n\n==============================")
+    print("=== /api/send_audio CALLED ===")
+    print("==============================")
+
+    sess = await asyncio.to_thread(_get_session, session_id)
+    text = await _transcribe_upload(audio)
+    res = await llm_pool.submit(_run_turn, sess, text)
+    return _encode_audio(res, transport)
+
+def _start_streamed_turn(sess, text: str, transport: str):
+    """
+    Run a turn on the llm pool, reporting progress as events: `token` while the
+    reply is generated, `audio` per speech chunk, then `done` (or `error`).
+    Returns (asyncio.Queue of events, task). Raises Saturated if the pool is full.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def emit(event: dict):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    def worker():
+        try:
+            res = _run_turn(
+                sess, text,
+                on_token=lambda piece: emit({"type": "token", "text": piece}),
+                on_audio=lambda i, sentence, mp3: emit(
+                    dict(_audio_ref(mp3, transport), type="audio", index=i, text=sentence)
+                )
+            )
+            emit(dict(_encode_audio(res, transport), type="done"))
+        except VersionConflict:
+            # same meaning as the 409 the plain endpoints return: the client may resend
+            emit({"type": "error", "status": 409, "detail": "Session was updated by another request, please retry"})
+        except Exception as e:
+            print("Streaming turn error:", e)
+            emit({"type": "error", "detail": str(e)})
+
+    return events, llm_pool.submit(worker)
+
+async def _turn_events(events: asyncio.Queue, task):
+    while True:
+        event = await events.get()
+        yield event
+        if event["type"] in ("done", "error"):
+            break
+    await task
+
+@app.post("/api/send_audio_stream")
+async def send_audio_stream(audio: UploadFile = File(...), session_id: str = Form(...),
+                            transport: str = AUDIO_TRANSPORT):
+    """
+    Same turn as /api/send_audio, answered as Server-Sent Events:
+    one `user_text` event, `token` events while the interviewer's reply is
+    generated, `audio` events with its speech in sentence order, then a
+    `done` event carrying the usual response body.
+    """
+    print("\n=== /api/send_audio_stream CALLED ===")
+    sess = await asyncio.to_thread(_get_session, session_id)
+    text = await _transcribe_upload(audio)
+
+    # admitted before the response starts, so a full pool is still a plain 503
+    events, task = _start_streamed_turn(sess, text, transport)
+
+    async def event_stream():
+        yield _sse({"type": "user_text", "text": text})
+        async for event in _turn_events(events, task):
+            yield _sse(event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+@app.websocket("/api/ws/answer")
+async def answer_ws(ws: WebSocket, session_id: str, transport: str = AUDIO_TRANSPORT):
+    """
+    Live answer upload with incremental transcription.
+    Client -> server: binary frames of 16 kHz mono little-endian float32 PCM
+    while the candidate speaks, then a text frame {"type": "end"}.
+    Server -> client: `partial` events as segments are transcribed, then the
+    same `user_text` / `token` / `audio` / `done` events as the SSE endpoint.
+    An answer is cut at TIMEOUT seconds of audio, as if `end` had been sent.
+    """
+    await ws.accept()
+    sess = await asyncio.to_thread(sessions.get, session_id)
+    if sess is None:
+        await ws.send_json({"type": "error", "status": 404, "detail": "Unknown or expired session"})
+        await ws.close(code=4404)
+        return
+
+    loop = asyncio.get_running_loop()
+    stream = StreamingTranscriber(
+        # segments are decoded on the STT pool like uploads, so live answers count against its backlog
+        lambda audio, prompt: stt_pool.call(transcribe_array, audio, prompt),
+        on_commit=lambda text: loop.call_soon_threadsafe(
+            asyncio.ensure_future, _send_quietly(ws, {"type": "partial", "text": text})
+        )
+    )
+    room = TIMEOUT * SAMPLE_RATE   # samples still accepted for this answer
+    try:
+        while True:
+            msg = await ws.receive()
+            if msg["type"] == "websocket.disconnect":
+                return
+            if msg.get("bytes"):
+                pcm = np.frombuffer(msg["bytes"], dtype="<f4")[:room]
+                stream.feed(pcm)
+                room -= len(pcm)
+                if room <= 0:
+                    break
+            elif msg.get("text") and json.loads(msg["text"]).get("type") == "end":
+                break
+
+        # only the audio after the last pause is still undecoded here. finish()
+        # waits for a segment that may be queued on stt_pool, so it must not
+        # hold a pool worker itself; its own decode goes through the pool.
+        text = await asyncio.to_thread(stream.finish)
+        await ws.send_json({"type": "user_text", "text": text})
+        events, task = _start_streamed_turn(sess, text, transport)
+        async for event in _turn_events(events, task):
+            await ws.send_json(event)
+    except Saturated as e:
+        await _send_quietly(ws, {"type": "error", "status": 503, "detail": f"Server busy ({e.stage}), please retry"})
+        await ws.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream.cancel()   # no-op after finish(); otherwise stops the background decoder
+
+async def _send_quietly(ws: WebSocket, event: dict):
+    try:
+        await ws.send_json(event)
+    except Exception:
+        pass
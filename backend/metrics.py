@@ -0,0 +1,142 @@
+# backend/metrics.py
+# Latency histograms and stats gauges in the Prometheus text format, without
+# the client library. Stages time themselves with `span("stt")` etc.; the
+# existing *_stats() dicts are exported as gauges through register_stats().
+import time
+import threading
+from contextlib import contextmanager
+
+# seconds; covers a cache hit (ms) up to a long feedback generation (tens of s)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (1, 5, 10, 25, 50, 100, 200, 400)
+RATE_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}   # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for key, s in sorted(series.items()):
+            base = [f'{n}="{v}"' for n, v in zip(self.labelnames, key)]
+            for bound, count in zip(self.buckets, s):
+                le = _labels(base + ['le="%s"' % bound])
+                lines.append(f"{self.name}_bucket{le} {count}")
+            le = _labels(base + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{le} {s[-1]}")
+            lines.append(f"{self.name}_sum{_labels(base)} {s[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(base)} {s[-1]}")
+        return lines
+
+
+def _labels(parts) -> str:
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+_registry_lock = threading.Lock()
+_histograms = []
+_stats = []   # (prefix, help, fn returning a dict)
+
+
+def histogram(name: str, help_text: str, buckets=LATENCY_BUCKETS, labelnames=()) -> Histogram:
+    h = Histogram(name, help_text, buckets, labelnames)
+    with _registry_lock:
+        _histograms.append(h)
+    return h
+
+
+def register_stats(prefix: str, help_text: str, fn):
+    """Export every numeric value of fn() (a *_stats() dict, nested dicts flattened) as a gauge."""
+    with _registry_lock:
+        _stats.append((prefix, help_text, fn))
+
+
+STAGE_SECONDS = histogram(
+    "interview_stage_seconds", "Wall time per request-path stage", labelnames=("stage",)
+)
+LLM_PREFILL_SECONDS = histogram(
+    "interview_llm_prefill_seconds", "Time from generate() start to the first new token, per batch"
+)
+LLM_TOKENS = histogram(
+    "interview_llm_generated_tokens", "New tokens generated per request", buckets=TOKEN_BUCKETS
+)
+LLM_TOKENS_PER_SECOND = histogram(
+    "interview_llm_tokens_per_second", "Generated tokens per second of generate() time, per batch",
+    buckets=RATE_BUCKETS
+)
+
+
+_samples = None   # stage -> [seconds], only while collect_samples() is on (benchmarks)
+
+
+def collect_samples(enabled: bool = True):
+    """Also keep every raw span duration, for exact percentiles in benchmarks."""
+    global _samples
+    _samples = {} if enabled else None
+
+
+def samples() -> dict:
+    return {k: list(v) for k, v in (_samples or {}).items()}
+
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if _samples is not None:
+            _samples.setdefault(stage, []).append(elapsed)
+
+
+def _flatten(prefix: str, stats: dict):
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+        elif isinstance(value, dict) and all(isinstance(k, str) for k in value):
+            yield from _flatten(name, value)
+
+
+def render() -> str:
+    with _registry_lock:
+        histograms = list(_histograms)
+        stats = list(_stats)
+    lines = []
+    for h in histograms:
+        lines.extend(h.render())
+    for prefix, help_text, fn in stats:
+        try:
+            values = list(_flatten(prefix, fn()))
+        except Exception as e:
+            print(f"Metrics: {prefix} stats failed:", e)
+            continue
+        for name, value in values:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,225 @@
+# backend/model_runtime.py
+# One copy of each model per process, shared by the server and agent_cli.
+# Nothing is loaded at import: the first caller (or warm_up) pays for it,
+# concurrent callers wait for that single load instead of starting their own.
+import gc
+import os
+import time
+import threading
+from config import MODEL_NAME, WHISPER_MODEL, LLM_DRAFT_MODEL, LLM_DRAFT_TOKENS
+
+
+class _LazyModel:
+    def __init__(self, name: str, loader, retry: bool = True):
+        self.name = name
+        self._loader = loader
+        self._retry = retry                    # False: a failed load is final
+        self._lock = threading.Lock()          # held for the whole load
+        self._hooks_lock = threading.Lock()    # never held while loading
+        self._value = None
+        self._error = None
+        self._load_s = None
+        self._on_loaded = []
+
+    def get(self):
+        if self._value is not None:
+            return self._value
+        with self._lock:
+            if self._error is not None and not self._retry:
+                raise self._error
+            if self._value is None:
+                print(f"Loading {self.name}...")
+                t0 = time.perf_counter()
+                try:
+                    value = self._loader()
+                except Exception as e:
+                    self._error = e
+                    raise
+                self._load_s = time.perf_counter() - t0
+                self._error = None
+                self._value = value
+                print(f"{self.name} ready ({self._load_s:.1f}s).")
+        with self._hooks_lock:
+            hooks, self._on_loaded = self._on_loaded, []
+        for fn in hooks:
+            fn()
+        return self._value
+
+    def on_loaded(self, fn):
+        """Run fn() right after the model loads (immediately if it already has)."""
+        with self._hooks_lock:
+            if self._value is None:
+                self._on_loaded.append(fn)
+                return
+        fn()
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def status(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "load_s": round(self._load_s, 1) if self._load_s is not None else None,
+            "error": str(self._error) if self._error is not None else None,
+        }
+
+
+def _load_llm():
+    from transformers import AutoTokenizer
+    from precision import load_qwen
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    tokenizer.padding_side = "left"   # batched greedy decoding needs left padding
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    model, precision = load_qwen(MODEL_NAME)
+    return tokenizer, model, precision
+
+
+def _load_draft():
+    from precision import load_qwen, resolve_precision
+
+    precision = resolve_precision()
+    if precision == "prequantized":   # the saved int8 file is the main model; quantize the draft on load
+        precision = "int8"
+    draft, _ = load_qwen(LLM_DRAFT_MODEL, precision)
+    draft.generation_config.num_assistant_tokens = LLM_DRAFT_TOKENS
+    return draft
+
+
+def _load_whisper():
+    import whisper
+    return whisper.load_model(WHISPER_MODEL)
+
+
+_llm = _LazyModel("Qwen", _load_llm)
+_whisper = _LazyModel("Whisper", _load_whisper)
+_draft = _LazyModel("Qwen draft", _load_draft, retry=False)
+_draft_warned = False
+_preloaded = False   # set in gunicorn's master; forked workers inherit it
+_models = {"llm": _llm, "whisper": _whisper}
+_required = set()   # names in _models the selected backends need
+
+
+def require(name: str):
+    """Called by a backend when it is selected: warm_up() loads this model and ready() waits for it."""
+    _required.add(name)
+
+
+def get_llm():
+    """(tokenizer, model, precision) for MODEL_NAME, loaded on first use."""
+    return _llm.get()
+
+
+def get_draft():
+    """
+    Draft model for assisted decoding, or None when LLM_DRAFT_MODEL is unset
+    or failed to load. The draft only speeds decoding up, so a failed load is
+    reported once and generation carries on without it.
+    """
+    global _draft_warned
+    if not LLM_DRAFT_MODEL:
+        return None
+    try:
+        return _draft.get()
+    except Exception as e:
+        if not _draft_warned:
+            _draft_warned = True
+            print("Draft model unavailable, decoding without it:", e)
+        return None
+
+
+def get_whisper():
+    return _whisper.get()
+
+
+def on_llm_loaded(fn):
+    _llm.on_loaded(fn)
+
+
+def llm_loaded() -> bool:
+    return _llm.loaded
+
+
+def llm_precision():
+    return _llm.get()[2] if _llm.loaded else None
+
+
+def warm_up(llm: bool = True, whisper: bool = True, background: bool = True):
+    """
+    Load the models the selected backends need ahead of the first request;
+    each one on its own thread when `background`.
+    """
+    wanted = {"llm": llm, "whisper": whisper}
+    targets = [_models[name] for name in ("whisper", "llm") if name in _required and wanted[name]]
+    if _llm in targets and LLM_DRAFT_MODEL:
+        targets.append(_draft)
+
+    def load(m):
+        try:
+            m.get()
+        except Exception as e:
+            print(f"{m.name} warm-up failed:", e)
+
+    if not background:
+        for m in targets:
+            load(m)
+        return
+    for m in targets:
+        threading.Thread(target=load, args=(m,), name=f"warm-{m.name.lower()}", daemon=True).start()
+
+
+def load_before_fork(prepare=None):
+    """
+    Load every configured model in this (master) process so forked workers
+    share the weight pages copy-on-write instead of loading their own copy.
+    `prepare()` then runs any other one-off start-up work (cache warming) here,
+    once, instead of in every worker. Threads started on the way don't
+    survive fork(); the modules that start them reset themselves in the child.
+    """
+    global _preloaded
+    import torch
+    torch.set_num_threads(1)   # keep OpenMP from starting a pool the children would inherit broken
+    warm_up(background=False)
+    if prepare is not None:
+        prepare()
+    _preloaded = True
+    # freeze what exists now so the workers' GC never writes to (and copies) these pages
+    gc.collect()
+    gc.freeze()
+
+
+def preloaded() -> bool:
+    """True in gunicorn workers whose master already ran load_before_fork()."""
+    return _preloaded
+
+
+def memory_stats() -> dict:
+    """This process's resident and proportional (shared pages split between processes) memory."""
+    stats = {"pid": os.getpid()}
+    for path, fields in (("/proc/self/status", ("VmRSS",)), ("/proc/self/smaps_rollup", ("Pss", "Shared_Clean", "Shared_Dirty"))):
+        try:
+            with open(path) as f:
+                for line in f:
+                    key = line.split(":", 1)[0]
+                    if key in fields:
+                        stats[key.lower() + "_mb"] = round(int(line.split()[1]) / 1024)
+        except OSError:
+            pass
+    return stats
+
+
+def ready() -> bool:
+    # only models a selected backend needs (none for fake ones); the draft is optional
+    return all(_models[name].loaded for name in _required)
+
+
+def status() -> dict:
+    return {
+        "ready": ready(),
+        "llm": dict(_llm.status(), precision=llm_precision()),
+        "draft": dict(_draft.status(), model=LLM_DRAFT_MODEL),
+        "whisper": _whisper.status(),
+        "memory": memory_stats(),
+    }
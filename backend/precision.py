@@ -0,0 +1,91 @@
+# backend/precision.py
+# How the Qwen weights are held in memory on CPU.
+#   fp32         - original weights, ~12 GB for the 3B model
+#   bf16         - half the memory; fast only on CPUs with native bf16 (AVX512-BF16 / AMX)
+#   int8         - dynamic int8 quantization of every nn.Linear (weights int8, activations fp32)
+#   prequantized - an int8 model saved once by `python precision.py --save PATH`, loads without re-quantizing
+#   auto         - bf16 if the CPU has native support, else int8 if torch has a quantized engine, else fp32
+import os
+import torch
+from transformers import AutoModelForCausalLM
+from config import LLM_PRECISION, LLM_PREQUANTIZED_PATH
+
+PRECISIONS = ("fp32", "bf16", "int8", "prequantized")
+
+
+def _cpu_flags() -> set:
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def cpu_supports_bf16() -> bool:
+    try:
+        if torch.ops.mkldnn._is_mkldnn_bf16_supported():
+            flags = _cpu_flags()
+            # oneDNN emulates bf16 on plain AVX512, which is slower than fp32
+            return not flags or bool(flags & {"avx512_bf16", "amx_bf16"})
+    except Exception:
+        pass
+    return False
+
+
+def cpu_supports_int8() -> bool:
+    return any(e in torch.backends.quantized.supported_engines for e in ("x86", "fbgemm", "qnnpack"))
+
+
+def resolve_precision(precision: str = LLM_PRECISION) -> str:
+    if precision == "auto":
+        if cpu_supports_bf16():
+            return "bf16"
+        if cpu_supports_int8():
+            return "int8"
+        return "fp32"
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown LLM_PRECISION '{precision}', expected auto or one of {PRECISIONS}")
+    return precision
+
+
+def quantize_int8(model):
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_qwen(model_name: str, precision: str = LLM_PRECISION):
+    """Load the causal LM in the requested (or best available) precision. Returns (model, resolved precision)."""
+    precision = resolve_precision(precision)
+
+    if precision == "prequantized":
+        if not os.path.exists(LLM_PREQUANTIZED_PATH):
+            raise FileNotFoundError(
+                f"No prequantized model at {LLM_PREQUANTIZED_PATH}; "
+                f"create it with: python precision.py --save {LLM_PREQUANTIZED_PATH}"
+            )
+        model = torch.load(LLM_PREQUANTIZED_PATH, weights_only=False)
+    elif precision == "bf16":
+        model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.bfloat16)
+    else:
+        model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.float32)
+        if precision == "int8":
+            model = quantize_int8(model)
+
+    model.eval()
+    return model, precision
+
+
+if __name__ == "__main__":
+    import argparse
+    from config import MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="Save an int8-quantized copy of the model for LLM_PRECISION='prequantized'.")
+    parser.add_argument("--save", default=LLM_PREQUANTIZED_PATH)
+    args = parser.parse_args()
+
+    model, _ = load_qwen(MODEL_NAME, "int8")
+    os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+    torch.save(model, args.save)
+    print("Saved int8 model ->", args.save)
@@ -0,0 +1,7 @@
+# backend/precompute_questions.py
+# Offline step: rewrite the question bank (up to PRECOMPUTE_QUESTIONS_PER_ROLE per role) once and store text + audio.
+#   cd backend && python precompute_questions.py
+from agent import precompute_question_cache
+
+if __name__ == "__main__":
+    precompute_question_cache()
@@ -0,0 +1,237 @@
+# backend/question_bank.py
+# Interview questions for every role, read from a compact on-disk index.
+# The editable source is JSONL, one {"role", "text", "tags", "difficulty"} per
+# line. On first use it is compiled into <index_dir>/<stamp>/:
+#   text.bin     UTF-8 question texts back to back
+#   records.bin  one fixed-size record per question, grouped by role
+#   meta.json    role -> [start, end) record range, tag names
+# Both .bin files are memory-mapped, so only the questions actually asked
+# are ever paged in, however large the bank is.
+#   cd backend && python question_bank.py build     # (re)compile now
+#   cd backend && python question_bank.py stats
+import os
+import sys
+import json
+import mmap
+import random
+import shutil
+import struct
+import hashlib
+import threading
+from array import array
+from typing import List, NamedTuple, Optional
+from config import QUESTION_BANK_SOURCE, QUESTION_BANK_INDEX_DIR
+
+# text offset, text length, tag bitmask, difficulty
+_RECORD = struct.Struct("<QIQB3x")
+_MAX_TAGS = 64
+
+
+class Question(NamedTuple):
+    text: str
+    role: str
+    tags: tuple
+    difficulty: int
+
+
+def sample_indices(n: int, k: int, rng=random) -> List[int]:
+    """
+    k distinct values from range(n) in O(k) time and memory: a Fisher-Yates
+    shuffle that only records the positions it has swapped.
+    """
+    swapped = {}
+    out = []
+    for i in range(min(k, n)):
+        j = rng.randrange(i, n)
+        out.append(swapped.get(j, j))
+        swapped[j] = swapped.get(i, i)
+    return out
+
+
+def build_index(source: str, out_dir: str):
+    """Compile the JSONL source into the mmap-able index under out_dir (written atomically)."""
+    by_role, tags = {}, {}
+    with open(source, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                q = json.loads(line)
+                role, text = q["role"], q["text"].strip()
+            except (ValueError, KeyError) as e:
+                raise ValueError(f"{source}:{n}: bad question entry ({e})") from e
+            mask = 0
+            for tag in q.get("tags", ()):
+                if tag not in tags:
+                    if len(tags) == _MAX_TAGS:
+                        raise ValueError(f"{source}:{n}: more than {_MAX_TAGS} distinct tags")
+                    tags[tag] = len(tags)
+                mask |= 1 << tags[tag]
+            by_role.setdefault(role, []).append((text.encode("utf-8"), mask, int(q.get("difficulty", 1))))
+
+    tmp = f"{out_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    roles, offset, index = {}, 0, 0
+    with open(os.path.join(tmp, "text.bin"), "wb") as text_f, open(os.path.join(tmp, "records.bin"), "wb") as rec_f:
+        for role, questions in by_role.items():
+            roles[role] = [index, index + len(questions)]
+            for text, mask, difficulty in questions:
+                text_f.write(text)
+                rec_f.write(_RECORD.pack(offset, len(text), mask, difficulty))
+                offset += len(text)
+                index += 1
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"count": index, "roles": roles, "tags": list(tags)}, f, ensure_ascii=False)
+    try:
+        os.replace(tmp, out_dir)
+    except OSError:
+        # another process finished the same build first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _map(path: str):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class QuestionBank:
+    """
+    Read-only view of the compiled bank. Nothing is opened until the first
+    lookup; filtered candidate lists (role + tag/difficulty) are built once
+    per filter and reused, unfiltered ones are plain index ranges.
+    """
+
+    def __init__(self, source: str = QUESTION_BANK_SOURCE, index_dir: str = QUESTION_BANK_INDEX_DIR):
+        self.source = source
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._filtered = {}   # (role, tag, max_difficulty) -> array of record indices
+
+    # ---------------- loading ----------------
+    def stamp(self) -> str:
+        """Identifies this version of the source: changes whenever the file does."""
+        st = os.stat(self.source)
+        return hashlib.sha256(f"{os.path.abspath(self.source)}:{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()[:16]
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            path = os.path.join(self.index_dir, self.stamp())
+            if not os.path.exists(os.path.join(path, "meta.json")):
+                os.makedirs(self.index_dir, exist_ok=True)
+                build_index(self.source, path)
+                print(f"Question bank index built -> {path}")
+                self.prune(keep=os.path.basename(path))
+            with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self._roles = {role: tuple(r) for role, r in meta["roles"].items()}
+            self._tags = meta["tags"]
+            self._tag_bits = {tag: 1 << i for i, tag in enumerate(self._tags)}
+            self._text = _map(os.path.join(path, "text.bin"))
+            self._records = _map(os.path.join(path, "records.bin"))
+            self._count = meta["count"]
+            self._loaded = True
+
+    def prune(self, keep: str):
+        """
+        Remove index versions other than `keep`, plus temp dirs left by builds
+        that died. Processes still mapping an old version keep working: the
+        mapped files stay readable after they are unlinked.
+        """
+        try:
+            names = os.listdir(self.index_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name == keep:
+                continue
+            if name.endswith(".tmp"):
+                try:
+                    os.kill(int(name.split(".")[-2]), 0)
+                    continue                      # a build still in progress
+                except (ValueError, IndexError, ProcessLookupError):
+                    pass
+                except PermissionError:
+                    continue
+            shutil.rmtree(os.path.join(self.index_dir, name), ignore_errors=True)
+
+    # ---------------- lookups ----------------
+    def roles(self) -> List[str]:
+        self._ensure_loaded()
+        return list(self._roles)
+
+    def tags(self) -> List[str]:
+        self._ensure_loaded()
+        return list(self._tags)
+
+    def __len__(self):
+        self._ensure_loaded()
+        return self._count
+
+    def __getitem__(self, i: int) -> Question:
+        self._ensure_loaded()
+        offset, length, mask, difficulty = _RECORD.unpack_from(self._records, i * _RECORD.size)
+        role = next(r for r, (start, end) in self._roles.items() if start <= i < end)
+        tags = tuple(t for t in self._tags if mask & self._tag_bits[t])
+        return Question(self.text(i), role, tags, difficulty)
+
+    def text(self, i: int) -> str:
+        self._ensure_loaded()
+        offset, length, _, _ = _RECORD.unpack_from(self._records, i * _RECORD.size)
+        return bytes(self._text[offset:offset + length]).decode("utf-8")
+
+    def candidates(self, role: str, tag: Optional[str] = None, max_difficulty: Optional[int] = None):
+        """Record indices for a role, optionally narrowed to one tag and/or a difficulty ceiling."""
+        self._ensure_loaded()
+        start, end = self._roles.get(role, (0, 0))
+        if tag is None and max_difficulty is None:
+            return range(start, end)
+        key = (role, tag, max_difficulty)
+        found = self._filtered.get(key)
+        if found is None:
+            bit = self._tag_bits.get(tag, 0) if tag is not None else None
+            found = array("I")
+            for i in range(start, end):
+                _, _, mask, difficulty = _RECORD.unpack_from(self._records, i * _RECORD.size)
+                if bit is not None and not mask & bit:
+                    continue
+                if max_difficulty is not None and difficulty > max_difficulty:
+                    continue
+                found.append(i)
+            self._filtered[key] = found
+        return found
+
+    def sample(self, role: str, k: int, tag: Optional[str] = None,
+               max_difficulty: Optional[int] = None, rng=random) -> List[str]:
+        """k different questions for `role` (fewer if the role/filter has fewer)."""
+        pool = self.candidates(role, tag, max_difficulty)
+        return [self.text(pool[j]) for j in sample_indices(len(pool), k, rng)]
+
+    def iter_texts(self, role: str, limit: Optional[int] = None):
+        pool = self.candidates(role)
+        for j in range(len(pool) if limit is None else min(limit, len(pool))):
+            yield self.text(pool[j])
+
+
+question_bank = QuestionBank()
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if cmd == "build":
+        out = os.path.join(QUESTION_BANK_INDEX_DIR, question_bank.stamp())
+        shutil.rmtree(out, ignore_errors=True)
+        os.makedirs(QUESTION_BANK_INDEX_DIR, exist_ok=True)
+        build_index(QUESTION_BANK_SOURCE, out)
+        question_bank.prune(keep=os.path.basename(out))
+        print("Built ->", out)
+    print(f"{len(question_bank)} questions, tags: {', '.join(question_bank.tags()) or '-'}")
+    for role in question_bank.roles():
+        print(f"  {role:<12}{len(question_bank.candidates(role)):>8}")
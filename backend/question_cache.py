@@ -0,0 +1,137 @@
+# backend/question_cache.py
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+def content_hash(*parts) -> str:
+    """Stable hash over everything that shapes a rewrite."""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+class QuestionCache:
+    """
+    Rewritten bank questions and their MP3s, persisted under
+    <cache_dir>/<bank_hash>/. A different prompt, model or voice gives a
+    different hash and therefore a fresh directory. Each question has its own
+    <key>.json + <key>.mp3 pair, so lookups and writes stay O(1) however many
+    questions the bank holds. The directory is bounded by `max_bytes`,
+    evicting the least recently used pair; the first write to a new
+    directory removes the ones left by older hashes.
+    """
+
+    def __init__(self, cache_dir: str, bank_hash: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.bank_hash = bank_hash
+        self.dir = os.path.join(cache_dir, bank_hash)
+        self.max_bytes = max_bytes
+        self._entries = None          # key -> bytes on disk, oldest first; scanned lazily
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _key(self, q_raw: str) -> str:
+        return hashlib.sha256(q_raw.encode("utf-8")).hexdigest()[:32]
+
+    def _paths(self, key: str):
+        path = os.path.join(self.dir, key)
+        return path + ".json", path + ".mp3"
+
+    def get(self, q_raw: str) -> Optional[Tuple[str, bytes]]:
+        key = self._key(q_raw)
+        meta_path, mp3_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("q") != q_raw:
+                return None   # hash prefix collision
+            text = entry["text"]
+            with open(mp3_path, "rb") as f:
+                mp3 = f.read()
+            os.utime(mp3_path)   # mtime doubles as the LRU clock across restarts
+        except (OSError, ValueError, KeyError):
+            return None
+        with self._lock:
+            if self._entries is not None and key in self._entries:
+                self._entries.move_to_end(key)
+        return text, mp3
+
+    def put(self, q_raw: str, text: str, mp3: bytes):
+        key = self._key(q_raw)
+        meta_path, mp3_path = self._paths(key)
+        meta = json.dumps({"q": q_raw, "text": text}, ensure_ascii=False).encode("utf-8")
+        size = len(mp3) + len(meta)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            try:
+                if not os.path.isdir(self.dir):
+                    os.makedirs(self.dir, exist_ok=True)
+                    self.prune()
+                self._scan()
+                # audio first: a visible .json always has its .mp3
+                _write_atomic(mp3_path, mp3)
+                _write_atomic(meta_path, meta)
+            except OSError as e:
+                print("Question cache write error:", e)
+                return
+            self._size -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._size += size
+            while self._size > self.max_bytes and self._entries:
+                old, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                for path in self._paths(old)[::-1]:   # .json first, see above
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def prune(self):
+        """Remove cache directories of other hashes (a changed prompt, model or voice)."""
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            if name != self.bank_hash and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _scan(self):
+        # called with the lock held
+        if self._entries is not None:
+            return
+        found = []
+        for name in os.listdir(self.dir):
+            if not name.endswith(".mp3"):
+                continue
+            key = name[:-4]
+            try:
+                st = os.stat(os.path.join(self.dir, name))
+                size = st.st_size + os.path.getsize(os.path.join(self.dir, key + ".json"))
+            except OSError:
+                continue      # half-written or being evicted
+            found.append((st.st_mtime, key, size))
+        self._entries = OrderedDict()
+        self._size = 0
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+
+    def __len__(self):
+        try:
+            return sum(1 for name in os.listdir(self.dir) if name.endswith(".json"))
+        except OSError:
+            return 0
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
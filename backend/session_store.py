@@ -0,0 +1,262 @@
+# backend/session_store.py
+# Where interview snapshots live between turns. Every record carries a
+# version; put() only succeeds if the caller saw the latest one, so two
+# workers racing on the same session can't silently overwrite each other.
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional, Tuple
+from config import SESSION_STORE, SESSION_STORE_PATH, SESSION_STORE_DIR, SESSION_TTL
+
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+_LOCK_STRIPES = 64      # FileKV lock files, shared by sessions with the same id prefix
+_SWEEP_EVERY = 60.0     # seconds between FileKV expiry sweeps
+
+
+class VersionConflict(Exception):
+    """The session changed since it was read (another request or worker saved it first)."""
+
+    def __init__(self, session_id: str):
+        super().__init__(f"session {session_id} was modified concurrently")
+        self.session_id = session_id
+
+
+def encode(snapshot: dict) -> str:
+    return json.dumps(snapshot, separators=(",", ":"), ensure_ascii=False)
+
+
+def decode(data: str) -> dict:
+    return json.loads(data)
+
+
+class SessionStore:
+    """get() -> (version, snapshot) or None; put() -> new version or VersionConflict."""
+
+    def __init__(self, ttl: float = SESSION_TTL):
+        self.ttl = ttl
+
+    def get(self, session_id: str) -> Optional[Tuple[int, dict]]:
+        raise NotImplementedError
+
+    def put(self, session_id: str, snapshot: dict, expected_version: int) -> int:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    def _expired(self, updated: float) -> bool:
+        return time.time() - updated >= self.ttl
+
+
+# ===================== MEMORY (single process) =====================
+class MemorySessionStore(SessionStore):
+    def __init__(self, ttl: float = SESSION_TTL):
+        super().__init__(ttl)
+        self._records = {}   # session_id -> (version, encoded snapshot, updated)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            rec = self._records.get(session_id)
+            if rec is None:
+                return None
+            if self._expired(rec[2]):
+                del self._records[session_id]
+                return None
+        return rec[0], decode(rec[1])
+
+    def put(self, session_id, snapshot, expected_version):
+        data = encode(snapshot)
+        with self._lock:
+            current = self._records.get(session_id, (0,))[0]
+            if current != expected_version:
+                raise VersionConflict(session_id)
+            self._records[session_id] = (current + 1, data, time.time())
+            if current == 0:
+                self._purge()
+        return current + 1
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._records.pop(session_id, None) is not None
+
+    def _purge(self):
+        for sid in [s for s, rec in self._records.items() if self._expired(rec[2])]:
+            del self._records[sid]
+
+
+# ===================== SQLITE (processes on one host) =====================
+class SQLiteSessionStore(SessionStore):
+    def __init__(self, path: str = SESSION_STORE_PATH, ttl: float = SESSION_TTL):
+        super().__init__(ttl)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, version INTEGER NOT NULL, data TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        # a short-lived connection per call keeps this safe from any thread
+        return sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+
+    def get(self, session_id):
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT version, data, updated FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        if row is None or self._expired(row[2]):
+            return None
+        return row[0], decode(row[1])
+
+    def put(self, session_id, snapshot, expected_version):
+        data, now = encode(snapshot), time.time()
+        with self._connect() as db:
+            if expected_version == 0:
+                db.execute("DELETE FROM sessions WHERE updated < ?", (now - self.ttl,))
+                try:
+                    db.execute(
+                        "INSERT INTO sessions (id, version, data, updated) VALUES (?, 1, ?, ?)",
+                        (session_id, data, now)
+                    )
+                except sqlite3.IntegrityError:
+                    raise VersionConflict(session_id)
+                return 1
+            cur = db.execute(
+                "UPDATE sessions SET version = version + 1, data = ?, updated = ? WHERE id = ? AND version = ?",
+                (data, now, session_id, expected_version)
+            )
+            if cur.rowcount != 1:
+                raise VersionConflict(session_id)
+        return expected_version + 1
+
+    def delete(self, session_id):
+        with self._connect() as db:
+            return db.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0
+
+
+# ===================== FILE KV (stand-in for a shared KV) =====================
+class FileKVSessionStore(SessionStore):
+    """
+    One JSON file per session with compare-and-set under an flock, the same
+    contract a shared KV (Redis WATCH/MULTI, etcd txn) would provide. Point
+    the directory at a shared volume to try multi-node routing locally.
+    Locks are a fixed set of striped files that are never deleted (unlinking
+    a lock file another process has just opened would split the lock);
+    expired records are swept when new sessions are created.
+    """
+
+    def __init__(self, directory: str = SESSION_STORE_DIR, ttl: float = SESSION_TTL):
+        super().__init__(ttl)
+        self.dir = directory
+        self.lock_dir = os.path.join(directory, "locks")
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self._next_sweep = 0.0
+
+    def _path(self, session_id: str) -> Optional[str]:
+        # ids come from clients; never let one name an arbitrary file
+        if not _SESSION_ID.match(session_id or ""):
+            return None
+        return os.path.join(self.dir, session_id + ".json")
+
+    def _read(self, path: str):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, session_id):
+        path = self._path(session_id)
+        rec = self._read(path) if path else None
+        if rec is None or self._expired(rec["updated"]):
+            return None
+        return rec["version"], rec["snapshot"]
+
+    @contextmanager
+    def _locked(self, session_id: str):
+        import fcntl
+        stripe = int(session_id[:8], 16) % _LOCK_STRIPES
+        with open(os.path.join(self.lock_dir, f"{stripe:02x}.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def put(self, session_id, snapshot, expected_version):
+        path = self._path(session_id)
+        if path is None:
+            raise VersionConflict(session_id)
+        with self._locked(session_id):
+            rec = self._read(path)
+            current = rec["version"] if rec and not self._expired(rec["updated"]) else 0
+            if current != expected_version:
+                raise VersionConflict(session_id)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": current + 1, "updated": time.time(), "snapshot": snapshot},
+                          f, separators=(",", ":"), ensure_ascii=False)
+            os.replace(tmp, path)
+        if current == 0:
+            self._sweep()
+        return current + 1
+
+    def delete(self, session_id):
+        path = self._path(session_id)
+        if path is None:
+            return False
+        with self._locked(session_id):
+            try:
+                os.remove(path)
+                return True
+            except OSError:
+                return False
+
+    def _sweep(self):
+        # a record's mtime is its last save, so only stale files need reading
+        now = time.time()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + _SWEEP_EVERY
+        for entry in os.scandir(self.dir):
+            name = entry.name
+            try:
+                if not entry.is_file() or now - entry.stat().st_mtime < self.ttl:
+                    continue
+            except OSError:
+                continue
+            if name.endswith(".tmp") or name.endswith(".lock"):
+                # writes that died midway, and per-session locks from older versions
+                _remove_quietly(entry.path)
+                continue
+            sid = name[:-len(".json")]
+            if not name.endswith(".json") or not _SESSION_ID.match(sid):
+                continue
+            with self._locked(sid):
+                rec = self._read(entry.path)
+                if rec is None or self._expired(rec["updated"]):
+                    _remove_quietly(entry.path)
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def make_store(kind: str = SESSION_STORE) -> SessionStore:
+    if kind == "memory":
+        return MemorySessionStore()
+    if kind == "sqlite":
+        return SQLiteSessionStore()
+    if kind == "file":
+        return FileKVSessionStore()
+    raise ValueError(f"Unknown SESSION_STORE '{kind}', expected memory, sqlite or file")
@@ -0,0 +1,112 @@
+# backend/sessions.py
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from agent import InterviewAgent
+from config import SESSION_TTL, MAX_SESSIONS
+from session_store import SessionStore, VersionConflict, make_store
+
+
+class Session:
+    def __init__(self, session_id: str, agent: Optional[InterviewAgent] = None, version: int = 0):
+        self.session_id = session_id
+        self.agent = agent or InterviewAgent()
+        self.version = version    # store version this agent was loaded from / last saved as
+        # held for the whole turn so two uploads can't interleave on one agent
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+
+class SessionRegistry:
+    """
+    One InterviewAgent per browser session, persisted as a snapshot in a
+    SessionStore after every turn. The agents kept here are a cache: when the
+    store holds a newer version (another worker served the last turn), the
+    agent is rebuilt from the snapshot. Cached agents idle for longer than
+    `ttl` seconds are dropped, and when more than `max_sessions` are cached
+    the least recently used one is evicted; the store keeps its own TTL.
+    """
+
+    def __init__(self, store: Optional[SessionStore] = None,
+                 ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS):
+        self.store = store or make_store()
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()   # session_id -> Session, oldest first
+        self._lock = threading.Lock()
+
+    def create(self) -> Session:
+        """New session, cached locally; it reaches the store on its first save()."""
+        sess = Session(uuid.uuid4().hex)
+        with self._lock:
+            self._cache(sess)
+        return sess
+
+    def get(self, session_id: str) -> Optional[Session]:
+        record = self.store.get(session_id)
+        with self._lock:
+            self._evict_expired()
+            sess = self._sessions.get(session_id)
+            if record is None:
+                if sess is not None:
+                    self._drop(session_id)
+                return None
+            version, snapshot = record
+            if sess is None or sess.version != version:
+                if sess is not None:
+                    self._drop(session_id)
+                sess = Session(session_id, InterviewAgent.from_snapshot(snapshot), version)
+                self._cache(sess)
+            self._sessions.move_to_end(session_id)
+            sess.touch()
+            return sess
+
+    def save(self, sess: Session):
+        """Write the agent's snapshot back. Raises VersionConflict if someone saved in between."""
+        try:
+            sess.version = self.store.put(sess.session_id, sess.agent.snapshot(), sess.version)
+        except VersionConflict:
+            with self._lock:
+                if self._sessions.get(sess.session_id) is sess:
+                    self._drop(sess.session_id)   # reload the winner's state next time
+            raise
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            sess = self._sessions.pop(session_id, None)
+        if sess is not None:
+            sess.agent.close()
+        return self.store.delete(session_id) or sess is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def _cache(self, sess: Session):
+        self._sessions[sess.session_id] = sess
+        while len(self._sessions) > self.max_sessions:
+            old_id, old = self._sessions.popitem(last=False)
+            old.agent.close()
+            print("Evicted LRU session:", old_id)
+
+    def _drop(self, session_id: str):
+        sess = self._sessions.pop(session_id, None)
+        if sess is not None:
+            sess.agent.close()
+
+    def _evict_expired(self):
+        # entries are kept in access order, so expired ones are at the front
+        now = time.monotonic()
+        while self._sessions:
+            sid, sess = next(iter(self._sessions.items()))
+            if now - sess.last_seen < self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            sess.agent.close()
+            print("Expired idle session:", sid)
@@ -0,0 +1,45 @@
+# backend/stage_dag.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StageDAG:
+    """
+    Small dependency graph of blocking stages.
+    Each stage is fn(results) -> value, where `results` maps finished stage
+    names to their values. A stage starts as soon as its dependencies are
+    done, so independent stages overlap. run() returns (results, timings_ms).
+    """
+
+    def __init__(self):
+        self._stages = {}   # name -> (deps, fn); insertion order is a valid topological order
+
+    def add(self, name: str, fn, deps=()):
+        missing = [d for d in deps if d not in self._stages]
+        if missing:
+            raise ValueError(f"stage '{name}' depends on unknown stage(s) {missing}")
+        self._stages[name] = (tuple(deps), fn)
+        return self
+
+    def run(self):
+        results, timings, futures = {}, {}, {}
+        t0 = time.perf_counter()
+        # one thread per stage, so a stage waiting on its deps never blocks another
+        with ThreadPoolExecutor(max_workers=max(1, len(self._stages)), thread_name_prefix="stage") as pool:
+            for name, (deps, fn) in self._stages.items():
+                upstream = [futures[d] for d in deps]
+                futures[name] = pool.submit(self._run_stage, name, fn, upstream, results, timings)
+            for fut in futures.values():
+                fut.result()   # re-raise the first failure
+        timings["total"] = round(1000 * (time.perf_counter() - t0), 1)
+        return results, timings
+
+    @staticmethod
+    def _run_stage(name, fn, upstream, results, timings):
+        for fut in upstream:
+            fut.result()
+        start = time.perf_counter()
+        value = fn(results)
+        timings[name] = round(1000 * (time.perf_counter() - start), 1)
+        results[name] = value
+        return value
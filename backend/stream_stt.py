@@ -0,0 +1,152 @@
+# backend/stream_stt.py
+import threading
+from array import array
+import numpy as np
+from vad import frame_rms, speech_threshold
+from config import (
+    SAMPLE_RATE, VAD_FRAME_MS, STREAM_STT_MIN_SEGMENT, STREAM_STT_PAUSE, STREAM_STT_MAX_SEGMENT
+)
+
+
+class StreamingTranscriber:
+    """
+    Transcribes an answer while it is still being spoken.
+    feed() takes 16 kHz mono float32 chunks as they arrive; a background
+    thread cuts the buffer at pauses and decodes each finished segment, so
+    finish() only has to transcribe the audio after the last pause.
+
+    transcribe_fn(audio, prompt) -> str does the decoding; `prompt` is the
+    text committed so far, which keeps Whisper consistent across segments.
+    If it raises for a segment (e.g. no STT capacity), that audio is kept
+    and decoded by finish() instead, where the error can reach the caller.
+    """
+
+    def __init__(self, transcribe_fn, on_commit=None, sr: int = SAMPLE_RATE):
+        self.transcribe_fn = transcribe_fn
+        self.on_commit = on_commit          # called with the full text after each segment
+        self.sr = sr
+        self._flen = max(1, int(sr * VAD_FRAME_MS / 1000))
+        self._chunks = []
+        self._samples = 0
+        self._rms = array("f")              # energy of every complete frame in the buffer
+        self._partial = np.zeros(0, dtype=np.float32)   # samples after the last complete frame
+        self._checked = 0                   # frames already looked at by _cut_point
+        self._deferred = False              # a segment failed: leave the rest to finish()
+        self._committed = []
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="stream-stt", daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        if not len(chunk):
+            return
+        with self._cond:
+            if self._closed:
+                return
+            self._chunks.append(chunk)
+            self._samples += len(chunk)
+            self._add_frames(chunk)
+            self._cond.notify()
+
+    def text(self) -> str:
+        with self._cond:
+            return " ".join(self._committed)
+
+    def finish(self) -> str:
+        """Stop accepting audio, decode whatever is left, return the whole answer."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        with self._cond:
+            tail = self._take(self._samples)
+        self._commit(tail)
+        return self.text()
+
+    def cancel(self):
+        """Drop the stream without decoding the rest (client went away)."""
+        with self._cond:
+            self._closed = True
+            self._chunks, self._samples = [], 0
+            self._cond.notify()
+
+    def _run(self):
+        cut = None
+
+        def ready():
+            nonlocal cut
+            cut = None if self._closed else self._cut_point()
+            return self._closed or cut is not None
+
+        while True:
+            with self._cond:
+                self._cond.wait_for(ready, timeout=0.25)
+                if self._closed:
+                    return
+                segment = self._take(cut) if cut else None
+            if segment is None:
+                continue
+            try:
+                self._commit(segment)
+            except Exception as e:
+                print("Streaming STT segment deferred to finish():", e)
+                with self._cond:
+                    self._chunks.insert(0, segment)
+                    self._samples += len(segment)
+                    self._deferred = True
+                return
+
+    def _add_frames(self, chunk):
+        # called with the lock held; only the frames this chunk completes are measured
+        audio = np.concatenate([self._partial, chunk]) if len(self._partial) else chunk
+        n = len(audio) // self._flen
+        if n:
+            self._rms.frombytes(frame_rms(audio[:n * self._flen], self.sr).astype(np.float32).tobytes())
+        self._partial = audio[n * self._flen:]
+
+    def _cut_point(self):
+        # called with the lock held; returns a sample index or None
+        if self._deferred or self._samples < STREAM_STT_MIN_SEGMENT * self.sr:
+            return None
+        n = len(self._rms)
+        if n == self._checked:
+            return None
+        self._checked = n
+        rms = np.frombuffer(self._rms, dtype=np.float32)
+        # judge the tail against the whole buffer so its noise floor is meaningful
+        pause_frames = max(1, int(STREAM_STT_PAUSE * 1000 / VAD_FRAME_MS))
+        if not (rms[-pause_frames:] > speech_threshold(rms)).any():
+            return self._samples
+        if self._samples >= STREAM_STT_MAX_SEGMENT * self.sr:
+            # no pause in sight: cut at the quietest frame in the second half
+            half = n // 2
+            return (half + int(np.argmin(rms[half:]))) * self._flen
+        return None
+
+    def _take(self, n):
+        # called with the lock held; n is the whole buffer or a frame boundary
+        if not self._chunks or n <= 0:
+            return None
+        audio = np.concatenate(self._chunks)
+        head, rest = audio[:n], audio[n:]
+        self._chunks = [rest] if len(rest) else []
+        self._samples = len(rest)
+        if len(rest):
+            del self._rms[:n // self._flen]
+        else:
+            self._rms, self._partial = array("f"), np.zeros(0, dtype=np.float32)
+        self._checked = 0
+        return head
+
+    def _commit(self, segment):
+        if segment is None or not len(segment):
+            return
+        text = (self.transcribe_fn(segment, self.text() or None) or "").strip()
+        if not text:
+            return
+        with self._cond:
+            self._committed.append(text)
+        if self.on_commit is not None:
+            self.on_commit(self.text())
@@ -0,0 +1,46 @@
+# backend/stt_backends.py
+# Speech recognizers behind stt_engine.transcribe_array, chosen by
+# config.STT_BACKEND. Each one turns 16 kHz mono float32 samples into text;
+# VAD, the model lock and metrics stay in stt_engine.
+import numpy as np
+from model_runtime import require, get_whisper
+from fake_backends import fake_transcribe
+
+
+class STTBackend:
+    name = ""
+
+    def transcribe(self, audio: np.ndarray, prompt: str = None) -> str:
+        raise NotImplementedError
+
+
+# ===================== WHISPER =====================
+class WhisperBackend(STTBackend):
+    """WHISPER_MODEL, loaded by model_runtime; `prompt` becomes Whisper's initial_prompt."""
+    name = "whisper"
+
+    def __init__(self):
+        require("whisper")
+
+    def transcribe(self, audio: np.ndarray, prompt: str = None) -> str:
+        res = get_whisper().transcribe(
+            np.ascontiguousarray(audio, dtype=np.float32), fp16=False, initial_prompt=prompt
+        )
+        return res.get("text", "").strip()
+
+
+# ===================== FAKE (benchmarks) =====================
+class FakeSTTBackend(STTBackend):
+    name = "fake"
+
+    def transcribe(self, audio: np.ndarray, prompt: str = None) -> str:
+        return fake_transcribe(audio, prompt)
+
+
+BACKENDS = {b.name: b for b in (WhisperBackend, FakeSTTBackend)}
+
+
+def make_backend(name: str) -> STTBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown STT_BACKEND '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
@@ -1,14 +1,33 @@
 # backend/stt_engine.py
-import whisper
+import io
+import threading
+import subprocess
+import numpy as np
+import soundfile as sf
 import os
+from config import SAMPLE_RATE, VAD_ENABLED, STT_BACKEND
+from vad import trim_silence
+from metrics import span
+from stt_backends import make_backend
 
-print("Loading Whisper (backend)...")
-_whisper = whisper.load_model("small")   # uses config.WHISPER_MODEL if you prefer
+# uploads and live streams share one model; decode one clip at a time
+_whisper_lock = threading.Lock()
+backend = make_backend(STT_BACKEND)
 
-def transcribe_file(path: str) -> str:
+def transcribe_array(audio: np.ndarray, prompt: str = None, vad: bool = VAD_ENABLED) -> str:
+    """
+    Transcribe 16 kHz mono float32 samples already in memory.
+    With `vad`, silence is trimmed first so Whisper only decodes speech.
+    `prompt` (earlier text of the same answer) is passed as Whisper's initial_prompt.
+    """
+    if vad:
+        with span("vad"):
+            audio, _ = trim_silence(audio)
+        if len(audio) == 0:
+            return ""
     try:
-        res = _whisper.transcribe(path)
-        text = res.get("text", "").strip()
+        with _whisper_lock, span("stt"):
+            text = backend.transcribe(audio, prompt)
         print("=== Whisper Transcription ===")
         print(text)
         print("=============================")
@@ -16,3 +35,51 @@ def transcribe_file(path: str) -> str:
     except Exception as e:
         print("Whisper transcribe error:", e)
         return ""
+
+def transcribe_bytes(data: bytes) -> str:
+    """Transcribe an uploaded clip (webm/opus, wav, ...) without touching disk."""
+    try:
+        with span("decode"):
+            audio = decode_audio_bytes(data)
+    except Exception as e:
+        print("Audio decode error:", e)
+        return ""
+    return transcribe_array(audio)
+
+def decode_audio_bytes(data: bytes, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode an encoded clip into mono float32 at `sr`.
+    WAV/FLAC/OGG are read by soundfile straight from memory; anything else
+    (the browser's webm/opus) is piped through ffmpeg over stdin/stdout.
+    """
+    try:
+        audio, file_sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except Exception:
+        return _ffmpeg_decode(data, sr)
+    return resample(audio.mean(axis=1), file_sr, sr)
+
+def _ffmpeg_decode(data: bytes, sr: int) -> np.ndarray:
+    # same conversion whisper.load_audio does, but fed from a pipe instead of a path
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr),
+        "-"
+    ]
+    try:
+        out = subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg failed: {e.stderr.decode(errors='ignore')[-300:]}") from e
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+def resample(audio: np.ndarray, src_sr: int, dst_sr: int = SAMPLE_RATE) -> np.ndarray:
+    if src_sr == dst_sr or len(audio) == 0:
+        return audio.astype(np.float32, copy=False)
+    if src_sr % dst_sr == 0:
+        # integer decimation (48k/32k -> 16k): average each block as a cheap low-pass
+        k = src_sr // dst_sr
+        n = len(audio) // k * k
+        return audio[:n].reshape(-1, k).mean(axis=1).astype(np.float32)
+    n_out = int(round(len(audio) * dst_sr / src_sr))
+    t_out = np.arange(n_out) * (src_sr / dst_sr)
+    return np.interp(t_out, np.arange(len(audio)), audio).astype(np.float32)
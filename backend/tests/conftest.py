@@ -0,0 +1,7 @@
+# backend/tests/conftest.py
+# backend modules import each other flat (`from config import ...`), as they do
+# when run from inside backend/
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,33 @@
+# backend/tests/test_vad.py
+import numpy as np
+from config import SAMPLE_RATE
+from vad import speech_frames, trim_silence
+
+
+def _tone(seconds, amp, sr=SAMPLE_RATE):
+    t = np.arange(int(seconds * sr)) / sr
+    return (amp * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def test_continuous_speech_is_kept():
+    # speech from the first sample to the last: no silence to estimate a
+    # noise floor from, so nothing should be trimmed
+    audio = _tone(3.0, 0.3)
+    assert speech_frames(audio).all()
+    trimmed, removed = trim_silence(audio)
+    assert len(trimmed) == len(audio)
+    assert removed == 0
+
+
+def test_surrounding_silence_is_trimmed():
+    rng = np.random.default_rng(0)
+    silence = (0.001 * rng.standard_normal(SAMPLE_RATE)).astype(np.float32)
+    audio = np.concatenate([silence, _tone(1.0, 0.3), silence])
+    trimmed, removed = trim_silence(audio)
+    assert 0 < len(trimmed) < len(audio)
+    assert removed > 1.0
+
+
+def test_pure_silence_comes_back_empty():
+    trimmed, _ = trim_silence(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    assert len(trimmed) == 0
@@ -0,0 +1,131 @@
+# backend/tts_backends.py
+# Speech synthesizers behind tts_engine.synthesize_mp3_bytes, chosen by
+# config.TTS_BACKEND. Each one turns text into MP3 bytes; caching,
+# single-flight and the concurrency cap stay in tts_engine.
+import os
+import shutil
+import asyncio
+import threading
+import subprocess
+import concurrent.futures
+from config import EDGE_TTS_TIMEOUT, LOCAL_TTS_VOICE, LOCAL_TTS_RATE, LOCAL_TTS_BITRATE
+from fake_backends import fake_synthesize
+
+
+class TTSBackend:
+    name = ""
+    persist = True   # whether tts_engine may keep this backend's audio in the disk cache
+
+    def synthesize(self, text: str, voice: str) -> bytes:
+        raise NotImplementedError
+
+    def cache_voice(self, voice: str) -> str:
+        """Voice part of the TTS cache key, so backends never serve each other's audio."""
+        return f"{self.name}:{voice}"
+
+
+# ===================== EDGE-TTS (network) =====================
+class EdgeTTSBackend(TTSBackend):
+    """
+    One long-lived event loop on a daemon thread serves every synthesis.
+    Callers block on a future while their utterance streams in; several can
+    be in flight on the loop at once (capped by tts_engine's semaphore).
+    Audio chunks from Communicate.stream() are joined in memory.
+    """
+    name = "edge"
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+        # a loop started before fork (gunicorn's master warming the cache) has
+        # no thread in the child; forget it so the child starts its own
+        os.register_at_fork(after_in_child=self._forget_loop)
+
+    def synthesize(self, text: str, voice: str) -> bytes:
+        fut = asyncio.run_coroutine_threadsafe(self._synth(text, voice), self._get_loop())
+        try:
+            return fut.result(timeout=EDGE_TTS_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            fut.cancel()
+            raise RuntimeError(f"edge-tts timed out after {EDGE_TTS_TIMEOUT}s")
+
+    def cache_voice(self, voice: str) -> str:
+        return voice   # keeps entries cached before backends existed
+
+    @staticmethod
+    async def _synth(text: str, voice: str) -> bytes:
+        import edge_tts   # only needed when this backend is selected
+        chunks = []
+        async for chunk in edge_tts.Communicate(text, voice=voice).stream():
+            if chunk["type"] == "audio":
+                chunks.append(chunk["data"])
+        if not chunks:
+            raise RuntimeError("edge-tts returned no audio")
+        return b"".join(chunks)
+
+    def _get_loop(self):
+        if self._loop is not None:
+            return self._loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="edge-tts-loop", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def _forget_loop(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+
+# ===================== ESPEAK-NG (local CPU) =====================
+class EspeakBackend(TTSBackend):
+    """
+    Offline synthesis: espeak-ng renders WAV on stdout, ffmpeg encodes it to
+    MP3 over pipes. Edge voice names don't apply; LOCAL_TTS_VOICE is used.
+    """
+    name = "espeak"
+
+    def __init__(self):
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak") or "espeak-ng"
+
+    def synthesize(self, text: str, voice: str) -> bytes:
+        wav = self._run(
+            [self.binary, "--stdin", "--stdout", "-v", LOCAL_TTS_VOICE, "-s", str(LOCAL_TTS_RATE)],
+            text.encode("utf-8")
+        )
+        return self._run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-f", "wav", "-i", "pipe:0",
+             "-codec:a", "libmp3lame", "-b:a", LOCAL_TTS_BITRATE, "-f", "mp3", "pipe:1"],
+            wav
+        )
+
+    def cache_voice(self, voice: str) -> str:
+        return f"{self.name}:{LOCAL_TTS_VOICE}:{LOCAL_TTS_RATE}"
+
+    @staticmethod
+    def _run(cmd, data: bytes) -> bytes:
+        try:
+            return subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+        except FileNotFoundError as e:
+            raise RuntimeError(f"{cmd[0]} is not installed (needed for TTS_BACKEND='espeak')") from e
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"{cmd[0]} failed: {e.stderr.decode(errors='ignore')[-300:]}") from e
+
+
+# ===================== FAKE (benchmarks) =====================
+class FakeTTSBackend(TTSBackend):
+    name = "fake"
+    persist = False   # never write stand-in audio to disk
+
+    def synthesize(self, text: str, voice: str) -> bytes:
+        return fake_synthesize(text, voice)
+
+
+BACKENDS = {b.name: b for b in (EdgeTTSBackend, EspeakBackend, FakeTTSBackend)}
+
+
+def make_backend(name: str) -> TTSBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown TTS_BACKEND '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
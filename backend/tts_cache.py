@@ -0,0 +1,145 @@
+# backend/tts_cache.py
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+def cache_key(voice: str, text: str) -> str:
+    return hashlib.sha256(f"{voice}\0{text}".encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Two-tier MP3 cache keyed on (voice, text).
+    Memory tier: LRU bounded by `mem_bytes`. Disk tier: one file per key under
+    `disk_dir`, bounded by `disk_bytes`, evicting the least recently used file.
+    Disk hits are promoted back into memory.
+    """
+
+    def __init__(self, mem_bytes: int, disk_dir: Optional[str], disk_bytes: int):
+        self.mem_bytes = mem_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self._mem = OrderedDict()     # key -> mp3 bytes
+        self._mem_size = 0
+        self._disk = None             # key -> file size, oldest first; scanned lazily
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, voice: str, text: str) -> Optional[bytes]:
+        key = cache_key(voice, text)
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return data
+            data = self._disk_get(key)
+            if data is not None:
+                self._mem_put(key, data)
+                self.disk_hits += 1
+                return data
+            self.misses += 1
+            return None
+
+    def put(self, voice: str, text: str, data: bytes):
+        if not data:
+            return
+        key = cache_key(voice, text)
+        with self._lock:
+            self._mem_put(key, data)
+            self._disk_put(key, data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "mem_entries": len(self._mem),
+                "mem_bytes": self._mem_size,
+                "disk_entries": len(self._disk or ()),
+                "disk_bytes": self._disk_size,
+            }
+
+    # ---------------- memory tier ----------------
+    def _mem_put(self, key, data):
+        if len(data) > self.mem_bytes:
+            return
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_size -= len(old)
+        self._mem[key] = data
+        self._mem_size += len(data)
+        while self._mem_size > self.mem_bytes:
+            _, dropped = self._mem.popitem(last=False)
+            self._mem_size -= len(dropped)
+
+    # ---------------- disk tier ----------------
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + ".mp3")
+
+    def _scan_disk(self):
+        if self._disk is not None:
+            return
+        self._disk = OrderedDict()
+        self._disk_size = 0
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return
+        found = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith(".mp3"):
+                    continue
+                st = os.stat(os.path.join(root, name))
+                found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self._disk[key] = size
+            self._disk_size += size
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        self._scan_disk()
+        if key not in self._disk:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)   # mtime doubles as the LRU clock across restarts
+        except OSError:
+            self._disk_size -= self._disk.pop(key)
+            return None
+        self._disk.move_to_end(key)
+        return data
+
+    def _disk_put(self, key, data):
+        if not self.disk_dir or len(data) > self.disk_bytes:
+            return
+        self._scan_disk()
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print("TTS cache write error:", e)
+            return
+        self._disk_size -= self._disk.pop(key, 0)
+        self._disk[key] = len(data)
+        self._disk_size += len(data)
+        while self._disk_size > self.disk_bytes and self._disk:
+            old, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            try:
+                os.remove(self._path(old))
+            except OSError:
+                pass
@@ -1,57 +1,67 @@
 # backend/tts_engine.py
-import tempfile
-import os
 import threading
-import asyncio
-import edge_tts
-from typing import Optional
+from typing import Iterable, Optional
+from config import EDGE_VOICE, TTS_CACHE_DIR, TTS_CACHE_MEM_MB, TTS_CACHE_DISK_MB, TTS_MAX_CONCURRENCY, TTS_BACKEND
+from tts_cache import TTSCache, cache_key
+from metrics import span
+from tts_backends import make_backend
 
-EDGE_VOICE = "en-IN-NeerjaNeural"
+backend = make_backend(TTS_BACKEND)
+tts_cache = TTSCache(
+    mem_bytes=TTS_CACHE_MEM_MB * 1024 * 1024,
+    disk_dir=TTS_CACHE_DIR if backend.persist else None,
+    disk_bytes=TTS_CACHE_DISK_MB * 1024 * 1024,
+)
+# one synthesis per key at a time; concurrent callers wait for the first
+_inflight = {}
+_inflight_lock = threading.Lock()
+# caps concurrent syntheses no matter how many turns are running
+_tts_slots = threading.BoundedSemaphore(TTS_MAX_CONCURRENCY)
 
-async def _edge_synth(text: str, out: str):
-    comm = edge_tts.Communicate(text, voice=EDGE_VOICE)
-    await comm.save(out)
-
-def run_async(coro_fn, *args, **kwargs):
-    """
-    Run coroutine safely even if an asyncio loop is already running.
-    If not running, this just calls asyncio.run.
-    If a loop is running, it runs asyncio.run in a separate thread and returns when done.
-    """
-    try:
-        return asyncio.run(coro_fn(*args, **kwargs))
-    except RuntimeError:
-        # event loop already running in this thread — run in a thread
-        result = {}
-        def _target():
-            try:
-                result['res'] = asyncio.run(coro_fn(*args, **kwargs))
-            except Exception as e:
-                result['exc'] = e
-        th = threading.Thread(target=_target)
-        th.start()
-        th.join()
-        if 'exc' in result:
-            raise result['exc']
-        return result.get('res')
-
-def synthesize_mp3_bytes(text: str) -> bytes:
+def synthesize_mp3_bytes(text: str, voice: str = EDGE_VOICE) -> bytes:
     """
     Synthesize TTS to MP3, return bytes. Caller can hex() it for JSON transport.
+    Results are cached on (voice, text), so repeated phrases skip synthesis.
     """
     text = (text or "").strip()
     if not text:
         return b""
-    out_mp3 = tempfile.mktemp(suffix=".mp3")
+    cached_as = backend.cache_voice(voice)
+    data = tts_cache.get(cached_as, text)
+    if data is not None:
+        return data
+
+    key = cache_key(cached_as, text)
+    with _inflight_lock:
+        done = _inflight.get(key)
+        owner = done is None
+        if owner:
+            done = _inflight[key] = threading.Event()
+    if not owner:
+        done.wait()
+        data = tts_cache.get(cached_as, text)
+        if data is not None:
+            return data
+        return _synthesize_uncached(text, voice)   # the first attempt failed
+
     try:
-        # synthesize (blocking; safe for running event loop)
-        run_async(_edge_synth, text, out_mp3)
-        with open(out_mp3, "rb") as f:
-            data = f.read()
+        data = _synthesize_uncached(text, voice)
+        tts_cache.put(cached_as, text, data)
         return data
     finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        done.set()
+
+def warm_tts_cache(phrases: Iterable[str], voice: str = EDGE_VOICE):
+    """Synthesize fixed phrases up front so their first use is a cache hit."""
+    for text in phrases:
         try:
-            if os.path.exists(out_mp3):
-                os.remove(out_mp3)
-        except:
-            pass
+            synthesize_mp3_bytes(text, voice)
+        except Exception as e:
+            print("TTS warm-up error:", e)
+    print("TTS cache warm:", tts_cache.stats())
+
+def _synthesize_uncached(text: str, voice: str) -> bytes:
+    with _tts_slots, span("tts"):
+        return backend.synthesize(text, voice)
@@ -0,0 +1,77 @@
+# backend/tts_pipeline.py
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tts_engine import synthesize_mp3_bytes
+from config import TTS_PIPELINE_WORKERS, TTS_MIN_SENTENCE_CHARS
+
+# sentence end: ., ! or ? followed by whitespace, or any line break
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|[\r\n]+')
+
+
+class SentenceTTSPipeline:
+    """
+    Cuts streamed LLM text into sentences and synthesizes each one as soon as
+    it is complete. `on_audio(index, sentence, mp3)` is called in sentence
+    order, so playback can begin while later text is still being generated.
+    """
+
+    def __init__(self, on_audio, workers: int = TTS_PIPELINE_WORKERS,
+                 min_chars: int = TTS_MIN_SENTENCE_CHARS):
+        self.on_audio = on_audio
+        self.min_chars = min_chars
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-pipe")
+        self._buf = ""          # text after the last sentence boundary
+        self._pending = ""      # complete sentences still shorter than min_chars
+        self._jobs = []         # (sentence, future) in sentence order
+        self._next = 0          # index of the next chunk to deliver
+        self._lock = threading.Lock()
+
+    def feed(self, piece: str):
+        self._buf += piece
+        parts = _SENTENCE_END.split(self._buf)
+        self._buf = parts.pop()
+        for part in parts:
+            part = part.strip()
+            if not part:
+                continue
+            self._pending = (self._pending + " " + part).strip()
+            if len(self._pending) >= self.min_chars:
+                self._submit(self._pending)
+                self._pending = ""
+
+    def close(self) -> int:
+        """Flush the remaining text, wait for every chunk, return the chunk count."""
+        tail = (self._pending + " " + self._buf).strip()
+        self._pending = self._buf = ""
+        if tail:
+            self._submit(tail)
+        for _, fut in list(self._jobs):
+            fut.exception()   # wait; errors are already turned into empty audio
+        self._pool.shutdown(wait=True)
+        self._drain()
+        return len(self._jobs)
+
+    def _submit(self, sentence: str):
+        fut = self._pool.submit(self._synth, sentence)
+        with self._lock:
+            self._jobs.append((sentence, fut))
+        fut.add_done_callback(lambda _: self._drain())
+
+    @staticmethod
+    def _synth(sentence: str) -> bytes:
+        try:
+            return synthesize_mp3_bytes(sentence)
+        except Exception as e:
+            print("Pipeline TTS error:", e)
+            return b""
+
+    def _drain(self):
+        # deliver finished chunks strictly in order; a slow sentence holds back the ones after it
+        with self._lock:
+            while self._next < len(self._jobs):
+                sentence, fut = self._jobs[self._next]
+                if not fut.done():
+                    break
+                self.on_audio(self._next, sentence, fut.result())
+                self._next += 1
@@ -0,0 +1,87 @@
+# backend/vad.py
+import threading
+import numpy as np
+from config import (
+    SAMPLE_RATE, VAD_FRAME_MS, VAD_THRESHOLD, VAD_NOISE_RATIO, VAD_PAD_MS, VAD_MAX_PAUSE
+)
+
+_stats_lock = threading.Lock()
+_stats = {"clips": 0, "seconds_in": 0.0, "seconds_saved": 0.0}
+
+
+def frame_rms(audio: np.ndarray, sr: int = SAMPLE_RATE, frame_ms: int = VAD_FRAME_MS) -> np.ndarray:
+    flen = max(1, int(sr * frame_ms / 1000))
+    n = -(-len(audio) // flen)
+    padded = np.zeros(n * flen, dtype=np.float32)
+    padded[:len(audio)] = audio
+    return np.sqrt(np.mean(padded.reshape(n, flen) ** 2, axis=1))
+
+
+def speech_frames(audio: np.ndarray, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Boolean mask over VAD_FRAME_MS frames: True where the frame looks like speech."""
+    rms = frame_rms(audio, sr)
+    if len(rms) == 0:
+        return rms.astype(bool)
+    return rms > speech_threshold(rms)
+
+
+def speech_threshold(rms: np.ndarray) -> float:
+    """Frame energy above which a frame counts as speech, judged against all frames of the clip."""
+    noise_floor, loud = np.percentile(rms, [10, 90])
+    # the relative term must stay below the loud frames, or a clip that is
+    # speech from end to end would be measured against itself and vanish
+    return max(VAD_THRESHOLD, min(noise_floor * VAD_NOISE_RATIO, 0.5 * loud))
+
+
+def trim_silence(audio: np.ndarray, sr: int = SAMPLE_RATE):
+    """
+    Drop leading/trailing silence and shorten long internal pauses.
+    Returns (trimmed audio, seconds removed). A clip with no speech at all
+    comes back empty.
+    """
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    total = len(audio) / sr
+    flen = max(1, int(sr * VAD_FRAME_MS / 1000))
+    speech = speech_frames(audio, sr)
+    if not speech.any():
+        _record(total, total)
+        return audio[:0], total
+
+    # keep a little context around every speech frame
+    pad = int(VAD_PAD_MS / VAD_FRAME_MS)
+    keep = np.convolve(speech.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode="same") > 0
+
+    # cap each internal silent run at VAD_MAX_PAUSE (half kept at each edge)
+    max_pause = max(1, int(VAD_MAX_PAUSE * 1000 / VAD_FRAME_MS))
+    idx = np.flatnonzero(keep)
+    first, last = idx[0], idx[-1]
+    keep[:first] = False
+    keep[last + 1:] = False
+    gaps = np.flatnonzero(np.diff(idx) > 1)
+    for g in gaps:
+        start, end = idx[g] + 1, idx[g + 1]      # silent run is [start, end)
+        if end - start > max_pause:
+            head = max_pause // 2
+            keep[start:end] = False
+            keep[start:start + head] = True
+            keep[end - (max_pause - head):end] = True
+
+    frames = np.flatnonzero(keep)
+    pieces = [audio[f * flen:(f + 1) * flen] for f in frames]
+    out = np.concatenate(pieces) if pieces else audio[:0]
+    saved = total - len(out) / sr
+    _record(total, saved)
+    return out, saved
+
+
+def vad_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _record(seconds_in: float, saved: float):
+    with _stats_lock:
+        _stats["clips"] += 1
+        _stats["seconds_in"] += seconds_in
+        _stats["seconds_saved"] += saved
+    print(f"VAD: trimmed {saved:.2f}s of {seconds_in:.2f}s")
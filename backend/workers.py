@@ -0,0 +1,68 @@
+# backend/workers.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Saturated(Exception):
+    """A stage already has as much work in flight as it is allowed to queue."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"{stage} stage is saturated")
+        self.stage = stage
+
+
+class StagePool:
+    """
+    Dedicated thread pool for one CPU-heavy stage, with a bounded backlog.
+    At most `workers` calls run at once and `max_queue` more may wait; past
+    that, submit() raises Saturated right away so the caller can shed load.
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = workers
+        self.capacity = workers + max_queue
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-pool")
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+
+    def submit(self, fn, *args, **kwargs) -> asyncio.Future:
+        """Schedule fn off the event loop; await the returned future for its result."""
+        return asyncio.wrap_future(self._submit(fn, *args, **kwargs))
+
+    def call(self, fn, *args, **kwargs):
+        """Blocking form of submit() for code already on a worker thread."""
+        return self._submit(fn, *args, **kwargs).result()
+
+    def _submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise Saturated(self.name)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            fut = self._pool.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._done(None)
+            raise
+        fut.add_done_callback(self._done)
+        return fut
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.workers),
+                "rejected": self._rejected,
+            }
+
+    def _done(self, _):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
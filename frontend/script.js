@@ -11,6 +11,7 @@ const avatarImg = document.getElementById("avatar");
 const avatarGlow = document.getElementById("avatarGlow");
 const snico = document.getElementById("snico");
 const endBtn = document.getElementById("endBtn");
+const captionEl = document.getElementById("caption");
 
 // runtime state
 let masterStream = null;
@@ -18,6 +19,14 @@ let audioOnlyStream = null;
 let recorder = null;
 let recordedChunks = [];
 let isRecording = false;
+let sessionId = null;
+
+let streamingAnswer = false;
+let sttSocket = null;
+let backupStopped = null;   // resolves once the backup recording of a live answer has stopped
+let pcmCtx = null;
+let pcmSrc = null;
+let pcmNode = null;
 
 let audioCtxMeter = null;
 let analyserMeter = null;
@@ -30,7 +39,8 @@ let silenceThreshold = 0.02; // fallback
 
 const THINK_SECONDS = 15;
 const SILENCE_MS = 6000;
-const MAX_ANSWER_MS = 90_000;
+const MAX_ANSWER_MS = 90_000;   // config.TIMEOUT: the server stops live answers there too
+const STREAM_ANSWERS = true;   // send live PCM over a WebSocket so the server transcribes while you speak
 
 // Set avatar image
 avatarImg.src = AVATAR_URL;
@@ -54,18 +64,30 @@ function playServerHex(hexStr, onStart = null, onEnd = null) {
         const bytes = new Uint8Array(hexStr.match(/.{1,2}/g).map(h => parseInt(h, 16)));
         const blob = new Blob([bytes], { type: "audio/mpeg" });
         const url = URL.createObjectURL(blob);
-        const a = new Audio(url);
-
-        a.onplay = () => { if (onStart) onStart(); };
-        a.onended = () => { if (onEnd) onEnd(); URL.revokeObjectURL(url); };
-
-        a.play().catch(e => { console.warn("Playback failed:", e); if (onEnd) onEnd(); });
+        playUrl(url, onStart, () => { if (onEnd) onEnd(); URL.revokeObjectURL(url); });
     } catch (e) {
         console.error("playServerHex error", e);
         if (onEnd) onEnd();
     }
 }
 
+// Play an MP3 by URL; the browser streams /api/audio/{id} with range requests
+function playUrl(url, onStart = null, onEnd = null) {
+    const a = new Audio(url);
+
+    a.onplay = () => { if (onStart) onStart(); };
+    a.onended = () => { if (onEnd) onEnd(); };
+    a.onerror = () => { console.warn("Audio load failed:", url); if (onEnd) onEnd(); };
+
+    a.play().catch(e => { console.warn("Playback failed:", e); if (onEnd) onEnd(); });
+}
+
+// Play whatever audio a server reply carries: ai_audio_url (binary) or hex
+function playServerAudio(j, onStart = null, onEnd = null) {
+    if (j.ai_audio_url) playUrl(API_BASE + j.ai_audio_url, onStart, onEnd);
+    else playServerHex(j.ai_audio_b64 || j.ai_audio, onStart, onEnd);
+}
+
 // ❗ FIXED: Snico animates ONLY when interviewer speaks
 function setInterviewerSpeaking(on) {
     const bars = Array.from(document.querySelectorAll("#snico .bar"));
@@ -189,17 +211,28 @@ function calibrateAmbient(stream) {
     });
 }
 
+// POST that waits and retries while the server sheds load (503 + Retry-After)
+async function postWithRetry(path, body = undefined, tries = 4) {
+    for (let i = 1; ; i++) {
+        const res = await fetch(API_BASE + path, { method: "POST", body });
+        if (res.status !== 503 || i >= tries) return res;
+        const wait = (parseFloat(res.headers.get("Retry-After")) || 2) * 1000;
+        statusEl.textContent = "Server busy — retrying…";
+        await new Promise(r => setTimeout(r, wait));
+    }
+}
+
 // Start interview
 async function startInterview() {
     statusEl.textContent = "Contacting server...";
 
     try {
-        const res = await fetch(API_BASE + "/api/start", { method: "POST" });
+        const res = await postWithRetry("/api/start");
         const j = await res.json();
+        sessionId = j.session_id;
 
-        const hex = j.ai_audio_b64 || j.ai_audio;
-        playServerHex(
-            hex,
+        playServerAudio(
+            j,
             () => { setInterviewerSpeaking(true); statusEl.textContent = "Interviewer speaking…"; },
             () => {
                 setInterviewerSpeaking(false);
@@ -236,6 +269,18 @@ async function startRecordingAuto() {
     statusEl.textContent = "Calibrating mic…";
     silenceThreshold = await calibrateAmbient(audioOnlyStream);
 
+    streamingAnswer = false;
+    if (STREAM_ANSWERS) {
+        try {
+            await startPcmStream();
+            streamingAnswer = true;
+        } catch (e) {
+            console.warn("Live transcription unavailable, falling back to upload:", e);
+            stopPcmCapture();
+        }
+    }
+
+    // live answers are recorded too, so they can still be uploaded if the socket fails
     try {
         recorder = new MediaRecorder(audioOnlyStream, { mimeType: "audio/webm" });
     } catch {
@@ -244,7 +289,8 @@ async function startRecordingAuto() {
 
     recordedChunks = [];
     recorder.ondataavailable = e => recordedChunks.push(e.data);
-    recorder.onstop = onRecorderStop;
+    if (streamingAnswer) backupStopped = new Promise(r => { recorder.onstop = r; });
+    else recorder.onstop = onRecorderStop;
 
     recorder.start();
     isRecording = true;
@@ -301,43 +347,242 @@ function startSilenceMonitor(threshold) {
 
 // Stop recording
 function stopRecordingAuto() {
-    if (!recorder || !isRecording) return;
+    if (!isRecording) return;
     isRecording = false;
 
-    if (recorder.state === "recording") recorder.stop();
+    if (streamingAnswer) {
+        finishPcmStream();
+        if (recorder && recorder.state === "recording") recorder.stop();
+        statusEl.textContent = "Finishing transcription…";
+        return;
+    }
+    if (recorder && recorder.state === "recording") recorder.stop();
     statusEl.textContent = "Processing upload…";
 }
 
-// Upload and play interviewer response
+// ---- Live answer streaming (WebSocket + raw 16 kHz PCM) ----
+const PCM_WORKLET = `
+class PcmTap extends AudioWorkletProcessor {
+    process(inputs) {
+        const ch = inputs[0] && inputs[0][0];
+        if (ch) this.port.postMessage(ch.slice(0));
+        return true;
+    }
+}
+registerProcessor("pcm-tap", PcmTap);
+`;
+
+// Average blocks of input samples down to 16 kHz (cheap low-pass + decimate)
+function downsampleTo16k(buf, rate) {
+    if (rate === 16000) return buf;
+    const ratio = rate / 16000;
+    const out = new Float32Array(Math.floor(buf.length / ratio));
+    for (let i = 0; i < out.length; i++) {
+        const s = Math.floor(i * ratio);
+        const e = Math.min(buf.length, Math.floor((i + 1) * ratio));
+        let sum = 0;
+        for (let j = s; j < e; j++) sum += buf[j];
+        out[i] = sum / Math.max(1, e - s);
+    }
+    return out;
+}
+
+async function startPcmStream() {
+    const wsUrl = API_BASE.replace(/^http/, "ws") + "/api/ws/answer?session_id=" + encodeURIComponent(sessionId);
+    sttSocket = new WebSocket(wsUrl);
+    sttSocket.binaryType = "arraybuffer";
+    await new Promise((resolve, reject) => {
+        sttSocket.onopen = resolve;
+        sttSocket.onerror = reject;
+    });
+
+    captionEl.textContent = "";
+    playChain = Promise.resolve();
+    let turnDone = false;
+    let unknownSession = false;
+    sttSocket.onmessage = (msg) => {
+        const ev = JSON.parse(msg.data);
+        // the server stops listening at its own answer limit
+        if (ev.type === "user_text" && isRecording) stopRecordingAuto();
+        handleTurnEvent(ev);
+        if (ev.type === "done") turnDone = true;
+        if (ev.type === "error") unknownSession = ev.status === 404;
+        if (ev.type === "done" || ev.type === "error") sttSocket.close();
+    };
+    sttSocket.onclose = (e) => {
+        if (turnDone) return;
+        if (e.code === 4404 || unknownSession) abandonLiveAnswer();
+        else fallBackToUpload();   // 409, server busy (1013) or a dropped connection
+    };
+
+    pcmCtx = new (window.AudioContext || window.webkitAudioContext)();
+    const url = URL.createObjectURL(new Blob([PCM_WORKLET], { type: "application/javascript" }));
+    await pcmCtx.audioWorklet.addModule(url);
+    URL.revokeObjectURL(url);
+
+    pcmSrc = pcmCtx.createMediaStreamSource(audioOnlyStream);
+    pcmNode = new AudioWorkletNode(pcmCtx, "pcm-tap");
+    pcmNode.port.onmessage = (e) => {
+        if (sttSocket && sttSocket.readyState === WebSocket.OPEN) {
+            sttSocket.send(downsampleTo16k(e.data, pcmCtx.sampleRate).buffer);
+        }
+    };
+    pcmSrc.connect(pcmNode);
+    pcmNode.connect(pcmCtx.destination);   // keeps the node pulled; it outputs silence
+}
+
+function stopPcmCapture() {
+    try { if (pcmSrc) pcmSrc.disconnect(); } catch { }
+    try { if (pcmNode) pcmNode.disconnect(); } catch { }
+    if (pcmCtx) pcmCtx.close().catch(() => { });
+    pcmCtx = pcmSrc = pcmNode = null;
+}
+
+function finishPcmStream() {
+    stopPcmCapture();
+    if (audioCtxSilence) audioCtxSilence.close();
+    if (sttSocket && sttSocket.readyState === WebSocket.OPEN) {
+        sttSocket.send(JSON.stringify({ type: "end" }));
+    }
+}
+
+// The live answer failed: send the backup recording through /api/send_audio_stream
+function fallBackToUpload() {
+    if (!streamingAnswer) return;
+    streamingAnswer = false;
+    stopPcmCapture();
+    statusEl.textContent = isRecording ? "Recording… (max 90s)" : "Processing upload…";
+    if (recorder && recorder.state === "recording") {
+        recorder.onstop = onRecorderStop;   // still answering: upload when recording stops
+    } else {
+        backupStopped.then(onRecorderStop);
+    }
+}
+
+// The session is gone: drop the answer and start over
+function abandonLiveAnswer() {
+    streamingAnswer = false;
+    isRecording = false;
+    stopPcmCapture();
+    if (audioCtxSilence) audioCtxSilence.close().catch(() => { });
+    if (recorder && recorder.state === "recording") recorder.stop();
+    recordedChunks = [];
+    statusEl.textContent = "Session expired — restarting…";
+    setTimeout(startInterview, 800);
+}
+
+// Read a text/event-stream response body and hand each JSON event to onEvent
+async function readEventStream(res, onEvent) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buf = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buf += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buf.indexOf("\n\n")) >= 0) {
+            const frame = buf.slice(0, sep);
+            buf = buf.slice(sep + 2);
+            const data = frame.split("\n")
+                .filter(l => l.startsWith("data:"))
+                .map(l => l.slice(5).trim())
+                .join("\n");
+            if (data) onEvent(JSON.parse(data));
+        }
+    }
+}
+
+// Ordered playback of streamed audio chunks: each chunk starts when the previous ends
+let playChain = Promise.resolve();
+
+function playAudioAsync(j) {
+    return new Promise((resolve) => {
+        playServerAudio(
+            j,
+            () => { setInterviewerSpeaking(true); statusEl.textContent = "Interviewer speaking…"; },
+            resolve
+        );
+    });
+}
+
+function enqueueAudio(j) {
+    if (!j.ai_audio_url && !j.ai_audio_b64 && !j.ai_audio) return;
+    playChain = playChain.then(() => playAudioAsync(j));
+}
+
+// After the interviewer finished speaking: either think again or wrap up
+function afterReply(j) {
+    setInterviewerSpeaking(false);
+
+    if (j.expect_more !== false) {
+        statusEl.textContent = "Thinking (15s)…";
+        startThinkingTimer();
+    } else {
+        statusEl.textContent = "Interview complete.";
+        setInterviewerSpeaking(false);
+        setTimeout(() => {
+            alert("🎉 Thank you! The interview is complete.");
+        }, 500);
+    }
+}
+
+// One event of a streamed turn (SSE upload or live WebSocket answer)
+// set when a turn failed because another request saved the session first
+let turnConflict = false;
+
+function handleTurnEvent(ev) {
+    if (ev.type === "partial") {
+        statusEl.textContent = "Heard: " + ev.text.slice(-80);
+    } else if (ev.type === "user_text") {
+        statusEl.textContent = "Interviewer is replying…";
+    } else if (ev.type === "token") {
+        captionEl.textContent += ev.text;
+        captionEl.scrollTop = captionEl.scrollHeight;
+    } else if (ev.type === "audio") {
+        enqueueAudio(ev);
+    } else if (ev.type === "done") {
+        captionEl.textContent = ev.ai_text || captionEl.textContent;
+        enqueueAudio(ev);
+        playChain.then(() => afterReply(ev));
+    } else if (ev.type === "error") {
+        turnConflict = ev.status === 409;
+        statusEl.textContent = "Server error";
+    }
+}
+
+// Upload and stream the interviewer response
 async function onRecorderStop() {
     const blob = new Blob(recordedChunks, { type: "audio/webm" });
     const fd = new FormData();
     fd.append("audio", blob, "answer.webm");
+    fd.append("session_id", sessionId);
 
     try {
-        const res = await fetch(API_BASE + "/api/send_audio", { method: "POST", body: fd });
-        const j = await res.json();
-
-        const hex = j.ai_audio_b64 || j.ai_audio;
+        // a 409 means another request saved the session first: send the answer once more
+        for (let attempt = 0; attempt < 2; attempt++) {
+            const res = await postWithRetry("/api/send_audio_stream", fd);
+            if (res.status === 404) {
+                statusEl.textContent = "Session expired — restarting…";
+                setTimeout(startInterview, 800);
+                return;
+            }
+            if (res.status === 409 && attempt === 0) continue;
+            if (!res.ok) {
+                statusEl.textContent = "Server error";
+                return;
+            }
 
-        playServerHex(
-            hex,
-            () => { setInterviewerSpeaking(true); statusEl.textContent = "Interviewer speaking…"; },
-            () => {
-                setInterviewerSpeaking(false);
+            captionEl.textContent = "";
+            statusEl.textContent = "Interviewer is replying…";
+            playChain = Promise.resolve();
+            turnConflict = false;
 
-                if (j.expect_more !== false) {
-                    statusEl.textContent = "Thinking (15s)…";
-                    startThinkingTimer();
-                } else {
-                    statusEl.textContent = "Interview complete.";
-                    setInterviewerSpeaking(false);
-                    setTimeout(() => {
-                    alert("🎉 Thank you! The interview is complete.");
-                }, 500);
-                }
-            }
-        );
+            await readEventStream(res, handleTurnEvent);
+            if (!turnConflict) break;
+        }
 
     } catch (e) {
         console.error(e);
@@ -352,7 +597,11 @@ async function onRecorderStop() {
 endBtn.addEventListener("click", () => {
     if (isRecording) stopRecordingAuto();
     statusEl.textContent = "Interview ended by user.";
-    fetch(API_BASE + "/api/end", { method: "POST" }).catch(() => { });
+    if (!sessionId) return;
+    const fd = new FormData();
+    fd.append("session_id", sessionId);
+    fetch(API_BASE + "/api/end", { method: "POST", body: fd }).catch(() => { });
+    sessionId = null;
 });
 
 // Init